@@ -0,0 +1,56 @@
+"""
+FlatForest.predict_proba vs RandomForestClassifier.predict_proba by batch size.
+
+    python -m benchmarks.bench_flat_forest --batches 1 30 1000 20000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from src.inference.flat_forest import export_forest
+
+
+def make_training_set(rows, features, seed=0, missing=0.05):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(rows, features)).astype('float32')
+    y = pd.Series(values[:, 0] + 0.5 * values[:, 1] + rng.normal(size=rows) > 0).astype(int)
+    values[rng.random(values.shape) < missing] = np.nan
+    return pd.DataFrame(values, columns=[f"f{i}" for i in range(features)]), y
+
+
+def best_of(fn, arg, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batches', type=int, nargs='+', default=[1, 30, 1000, 20000])
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--features', type=int, default=26)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    X, y = make_training_set(5000, args.features)
+    model = RandomForestClassifier(n_estimators=args.trees, random_state=42).fit(X, y)
+    flat = export_forest(model)
+    print(f"{flat.n_trees} trees, {len(flat.feature)} nodes, depth {flat.depth}")
+
+    print(f"{'batch':>7} {'sklearn ms':>11} {'flat ms':>9} {'speedup':>8}")
+    for batch in args.batches:
+        X_batch, _ = make_training_set(batch, args.features, seed=batch)
+        sklearn_s, expected = best_of(model.predict_proba, X_batch, args.repeat)
+        flat_s, actual = best_of(flat.predict_proba, X_batch, args.repeat)
+        np.testing.assert_array_equal(actual, expected)
+        print(f"{batch:>7} {sklearn_s * 1000:>11.2f} {flat_s * 1000:>9.2f} {sklearn_s / flat_s:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
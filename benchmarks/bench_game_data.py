@@ -0,0 +1,69 @@
+"""
+create_game_data_df: vectorized W/L derivation vs the previous per-game loop.
+
+    python -m benchmarks.bench_game_data --scales 1 10 100
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_scoreboard
+from src.data_collection.future_game_collector import create_game_data_df
+from src.data_collection.schema import GAME_DATA_SCHEMA as SCHEMA, apply_schema
+
+
+def create_game_data_df_loop(scoreboard_df):
+    """The groupby/iloc implementation create_game_data_df replaced, kept as the reference"""
+    base_required_columns = ['GAME_ID', 'TEAM_ID', 'FG_PCT', 'REB', 'AST', 'PTS']
+    game_data = scoreboard_df[base_required_columns + ['GAME_DATE']].copy()
+
+    game_results = []
+    for game_id, game_group in scoreboard_df.groupby('GAME_ID'):
+        if len(game_group) == 2:
+            team1, team2 = game_group.iloc[0], game_group.iloc[1]
+            if team1['PTS'] > team2['PTS']:
+                team1_wl, team2_wl = 'W', 'L'
+            elif team1['PTS'] < team2['PTS']:
+                team1_wl, team2_wl = 'L', 'W'
+            else:
+                team1_wl, team2_wl = 'T', 'T'
+            game_results.append({'GAME_ID': game_id, 'TEAM_ID': team1['TEAM_ID'], 'WL': team1_wl})
+            game_results.append({'GAME_ID': game_id, 'TEAM_ID': team2['TEAM_ID'], 'WL': team2_wl})
+
+    game_data = game_data.merge(pd.DataFrame(game_results), on=['GAME_ID', 'TEAM_ID'], how='left')
+    for column in ['TOV', 'FG3_PCT', 'FT_PCT', 'IS_HOME']:
+        if column in scoreboard_df.columns:
+            game_data[column] = scoreboard_df[column]
+    return game_data
+
+
+def best_of(fn, arg, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = fn(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'scale':>6} {'rows':>9} {'loop s':>9} {'vector s':>9} {'speedup':>8}")
+    for scale in args.scales:
+        scoreboard_df = make_scoreboard(scale)
+        loop_s, expected = best_of(create_game_data_df_loop, scoreboard_df, 1 if scale > 10 else args.repeat)
+        vector_s, actual = best_of(create_game_data_df, scoreboard_df, args.repeat)
+        pd.testing.assert_frame_equal(actual, apply_schema(expected, SCHEMA))
+        print(f"{scale:>6} {len(scoreboard_df):>9} {loop_s:>9.3f} {vector_s:>9.3f} {loop_s / vector_s:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Entry-point import time (python -X importtime) checked against benchmarks/import_budget.json.
+
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --write-budget   # re-baseline after a deliberate change
+
+Each module is imported in a fresh interpreter; the best of --repeat runs is
+divided by the best `import pandas` time on the same machine, so the budget
+(max_ratio) holds across machines, and none of its forbidden packages may be
+loaded. Exits non-zero when any entry point is over budget.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_FILE = os.path.join(REPO_ROOT, 'benchmarks', 'import_budget.json')
+BUDGET_HEADROOM = 1.5
+BASELINE_MODULE = 'pandas'
+
+PROBE = "import {module}, json, sys; print(json.dumps(sorted(sys.modules)))"
+
+
+def measure(module):
+    """(cumulative import ms of module, top-level packages it loaded, heaviest direct imports)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE.format(module=module)],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    cumulative_us, children, pending = None, [], []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue  # header row
+        # One space after the bar, then two per nesting level; children are
+        # listed before the import they belong to
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            pending.append((int(cumulative) / 1000, name.strip()))
+        elif depth == 0:
+            if name.strip() == module:
+                cumulative_us, children = int(cumulative), pending
+            pending = []
+    packages = {name.split('.')[0] for name in json.loads(result.stdout.splitlines()[-1])}
+    return cumulative_us / 1000, packages, sorted(children, reverse=True)
+
+
+def load_budget(path=BUDGET_FILE):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', default=BUDGET_FILE)
+    parser.add_argument('--top', type=int, default=5, help="Heaviest direct imports to list per module")
+    parser.add_argument('--write-budget', action='store_true',
+                        help=f"Set every max_ratio to {BUDGET_HEADROOM}x the measured ratio")
+    args = parser.parse_args()
+
+    budget = load_budget(args.budget)
+    baseline_ms = min(measure(BASELINE_MODULE)[0] for _ in range(args.repeat))
+    print(f"Baseline: import {BASELINE_MODULE} took {baseline_ms:.1f} ms")
+
+    failures = []
+    print(f"{'module':<44} {'ms':>8} {'ratio':>6} {'budget':>6}  forbidden loaded")
+    for module, limits in budget.items():
+        runs = [measure(module) for _ in range(args.repeat)]
+        best_ms, packages, children = min(runs, key=lambda run: run[0])
+        ratio = best_ms / baseline_ms
+        forbidden = sorted(set(limits.get('forbidden', [])) & packages)
+
+        max_ratio = f"{limits['max_ratio']:.2f}" if 'max_ratio' in limits else '-'
+        print(f"{module:<44} {best_ms:>8.1f} {ratio:>6.2f} {max_ratio:>6}  {', '.join(forbidden) or '-'}")
+        for child_ms, name in children[:args.top]:
+            print(f"{'':<4}{name:<40} {child_ms:>8.1f}")
+
+        if args.write_budget:
+            limits['max_ratio'] = round(ratio * BUDGET_HEADROOM, 2)
+        elif ratio > limits['max_ratio']:
+            failures.append(f"{module} took {ratio:.2f}x import {BASELINE_MODULE} (budget {limits['max_ratio']}x)")
+        if forbidden:
+            failures.append(f"{module} loaded {', '.join(forbidden)}")
+
+    if args.write_budget:
+        with open(args.budget, 'w') as f:
+            json.dump(budget, f, indent=2)
+            f.write('\n')
+        print(f"Budget written to {args.budget}")
+    elif failures:
+        print("Over budget:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+identify_opponents: adjacent-pair vectorization vs the previous per-game loop.
+
+    python -m benchmarks.bench_opponents --scales 1 10 100
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_scoreboard
+from src.data_collection.future_game_collector import create_game_data_df
+from src.data_collection.previous_game_collector import identify_opponents
+from src.data_collection.schema import OPPONENTS_SCHEMA as SCHEMA, apply_schema
+
+
+def identify_opponents_loop(game_log):
+    """The groupby implementation identify_opponents replaced, kept as the reference"""
+    game_log = game_log.sort_values(by='GAME_ID')
+    opponent_mappings = []
+    for game_id, group in game_log.groupby('GAME_ID'):
+        if len(group) == 2:
+            team_ids = group['TEAM_ID'].values
+            opponent_mappings.append({'GAME_ID': game_id, 'TEAM_ID': team_ids[0], 'OPPONENT_TEAM_ID': team_ids[1]})
+            opponent_mappings.append({'GAME_ID': game_id, 'TEAM_ID': team_ids[1], 'OPPONENT_TEAM_ID': team_ids[0]})
+    return pd.DataFrame(opponent_mappings)
+
+
+def best_of(fn, arg, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'scale':>6} {'rows':>9} {'loop s':>9} {'vector s':>9} {'speedup':>8}")
+    for scale in args.scales:
+        # Shuffled, so the sort inside identify_opponents does real work
+        game_data_df = create_game_data_df(make_scoreboard(scale)).sample(frac=1, random_state=0)
+        loop_s, expected = best_of(identify_opponents_loop, game_data_df, 1 if scale > 10 else args.repeat)
+        vector_s, actual = best_of(identify_opponents, game_data_df, args.repeat)
+        pd.testing.assert_frame_equal(actual, apply_schema(expected, SCHEMA))
+        print(f"{scale:>6} {len(game_data_df):>9} {loop_s:>9.3f} {vector_s:>9.3f} {loop_s / vector_s:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
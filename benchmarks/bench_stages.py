@@ -0,0 +1,183 @@
+"""
+Time and peak memory of every pipeline stage on synthetic seasons, as JSON.
+
+    python -m benchmarks.bench_stages --scales 1 10 100 --output stages.json
+    python -m benchmarks.bench_stages --scales 1 10 --compare stages.json
+
+Stages run in pipeline order on make_scoreboard(scale) / make_team_stats(), so
+each one gets the previous stage's real output. Time is the best of --repeat
+runs; peak memory comes from one extra run under tracemalloc. With --compare,
+stages slower or hungrier than the baseline by more than --threshold are
+listed and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_scoreboard, make_team_stats
+from main import labelled_rows, prepare_features, train_model
+from src.data_collection.future_game_collector import create_game_data_df
+from src.data_collection.prepare_data import prepare_full_df
+from src.data_collection.previous_game_collector import identify_opponents
+from src.inference.flat_forest import export_forest
+from src.training.model_bundle import make_bundle, project_features
+
+STAGES = ['create_game_data_df', 'identify_opponents', 'prepare_full_df', 'prepare_features',
+          'train_model', 'predict', 'predict_flat']
+DEFAULT_THRESHOLD = 1.25
+# Scales at which a stage is only timed once
+SINGLE_RUN_SCALE = 100
+
+
+def measure(fn, repeat, memory=True):
+    """(result, best seconds, peak traced MB or None)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return result, min(timings), peak_mb
+
+
+def pipeline(scoreboard, team_stats):
+    """(stage, fn(outputs) -> output) in run order; outputs holds earlier stages' results"""
+    def predict(outputs):
+        X, _, _ = outputs['prepare_features']
+        bundle = make_bundle(outputs['train_model'], X, 'forest', 'season', [])
+        return bundle['estimator'].predict_proba(project_features(bundle, outputs['prepare_full_df']))
+
+    return [
+        ('create_game_data_df', lambda outputs: create_game_data_df(scoreboard)),
+        ('identify_opponents', lambda outputs: identify_opponents(outputs['create_game_data_df'])),
+        ('prepare_full_df', lambda outputs: prepare_full_df(
+            outputs['create_game_data_df'], team_stats, outputs['identify_opponents'])),
+        ('prepare_features', lambda outputs: prepare_features(labelled_rows(outputs['prepare_full_df']))),
+        ('train_model', lambda outputs: train_model(*outputs['prepare_features'][:2])),
+        ('predict', predict),
+        ('predict_flat', lambda outputs: outputs['flat'].predict_proba(outputs['prepare_features'][0])),
+    ]
+
+
+def run_scale(scale, stages, repeat, memory=True):
+    scoreboard = make_scoreboard(scale)
+    team_stats = make_team_stats()
+    repeat = 1 if scale >= SINGLE_RUN_SCALE else repeat
+
+    outputs, results = {}, []
+    for stage, fn in pipeline(scoreboard, team_stats):
+        if stage == 'predict_flat' and stage in stages:
+            outputs['flat'] = export_forest(outputs['train_model'])
+        if stage not in stages:
+            # Later stages still need this one's output
+            if any(STAGES.index(s) > STAGES.index(stage) for s in stages):
+                outputs[stage] = fn(outputs)
+            continue
+
+        outputs[stage], seconds, peak_mb = measure(lambda: fn(outputs), repeat, memory)
+        results.append({
+            'stage': stage,
+            'scale': scale,
+            'rows': len(scoreboard),
+            'seconds': seconds,
+            'peak_mb': peak_mb,
+        })
+        memory_text = '' if peak_mb is None else f" {peak_mb:>9.1f} MB"
+        print(f"{stage:<22} {scale:>6} {len(scoreboard):>9} {seconds:>9.3f} s{memory_text}", file=sys.stderr)
+    return results
+
+
+def run_metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    import sklearn
+
+    return {
+        'commit': commit,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+    }
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Prints current/baseline ratios; returns the (stage, scale, metric) pairs over threshold"""
+    previous = {(r['stage'], r['scale']): r for r in baseline['results']}
+    regressions = []
+    print(f"{'stage':<22} {'scale':>6} {'time x':>8} {'memory x':>9}   vs {baseline['meta'].get('commit')}",
+          file=sys.stderr)
+    for result in results:
+        before = previous.get((result['stage'], result['scale']))
+        if before is None:
+            continue
+        ratios = {}
+        for metric in ('seconds', 'peak_mb'):
+            if result[metric] is not None and before[metric]:
+                ratios[metric] = result[metric] / before[metric]
+                if ratios[metric] > threshold:
+                    regressions.append((result['stage'], result['scale'], metric))
+        time_ratio = f"{ratios['seconds']:.2f}" if 'seconds' in ratios else '-'
+        memory_ratio = f"{ratios['peak_mb']:.2f}" if 'peak_mb' in ratios else '-'
+        print(f"{result['stage']:<22} {result['scale']:>6} {time_ratio:>8} {memory_ratio:>9}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc run")
+    parser.add_argument('--output', default=None, help="Write results JSON here (default: stdout)")
+    parser.add_argument('--compare', default=None, help="Baseline JSON from an earlier run")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    print(f"{'stage':<22} {'scale':>6} {'rows':>9} {'time':>11} {'peak':>12}", file=sys.stderr)
+    results = []
+    for scale in args.scales:
+        results.extend(run_scale(scale, args.stages, args.repeat, memory=not args.no_memory))
+
+    report = {'meta': run_metadata(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"Regressions over {args.threshold}x: " + ', '.join(f"{s}@{x} {m}" for s, x, m in regressions),
+                  file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
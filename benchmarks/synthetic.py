@@ -0,0 +1,72 @@
+"""
+Synthetic scoreboard and team-stats frames shaped like the collectors' output.
+Scale 1 is one regular season: 1230 games, two LineScore rows each.
+"""
+import numpy as np
+import pandas as pd
+
+GAMES_PER_SEASON = 1230
+FIRST_TEAM_ID = 1610612737
+N_TEAMS = 30
+STAT_COLUMNS = ['FG_PCT', 'FG3_PCT', 'FT_PCT', 'REB', 'AST', 'TOV', 'STL', 'BLK', 'PTS']
+
+
+def make_scoreboard(scale=1, seed=0, first_season=2000):
+    """
+    LineScore-like rows for scale seasons' worth of games. A few games end tied
+    and a few only have one team row, to exercise the edge cases.
+    """
+    rng = np.random.default_rng(seed)
+    n_games = GAMES_PER_SEASON * scale
+
+    season_idx = np.arange(n_games) // GAMES_PER_SEASON
+    game_in_season = np.arange(n_games) % GAMES_PER_SEASON
+    game_ids = np.array([
+        f"002{(first_season + s) % 100:02d}{g + 1:05d}" for s, g in zip(season_idx, game_in_season)
+    ])
+    season_start = pd.to_datetime([f"{first_season + s}-10-20" for s in season_idx])
+    game_dates = season_start + pd.to_timedelta(game_in_season // 8, unit='D')
+
+    home = rng.integers(0, N_TEAMS, n_games)
+    away = (home + rng.integers(1, N_TEAMS, n_games)) % N_TEAMS
+    home_ids = FIRST_TEAM_ID + home
+    away_ids = FIRST_TEAM_ID + away
+
+    home_pts = rng.integers(85, 135, n_games)
+    away_pts = rng.integers(85, 135, n_games)
+
+    rows = 2 * n_games
+    df = pd.DataFrame({
+        'GAME_DATE': np.repeat(game_dates, 2),
+        'GAME_ID': np.repeat(game_ids, 2),
+        'TEAM_ID': np.column_stack([home_ids, away_ids]).ravel(),
+        'TEAM_ABBREVIATION': np.column_stack([home, away]).ravel().astype(str),
+        'PTS': np.column_stack([home_pts, away_pts]).ravel().astype(float),
+        'FG_PCT': rng.uniform(0.38, 0.56, rows).round(3),
+        'FT_PCT': rng.uniform(0.65, 0.90, rows).round(3),
+        'FG3_PCT': rng.uniform(0.28, 0.45, rows).round(3),
+        'AST': rng.integers(15, 35, rows).astype(float),
+        'REB': rng.integers(35, 55, rows).astype(float),
+        'TOV': rng.integers(8, 20, rows).astype(float),
+        'HOME_TEAM_ID': np.repeat(home_ids, 2),
+        'VISITOR_TEAM_ID': np.repeat(away_ids, 2),
+    })
+    df['IS_HOME'] = df['TEAM_ID'] == df['HOME_TEAM_ID']
+
+    # Roughly one tie and one incomplete game per 500
+    tied = rng.choice(n_games, max(1, n_games // 500), replace=False)
+    df.loc[2 * tied + 1, 'PTS'] = df.loc[2 * tied, 'PTS'].to_numpy()
+    incomplete = rng.choice(np.setdiff1d(np.arange(n_games), tied), max(1, n_games // 500), replace=False)
+    return df.drop(index=2 * incomplete + 1).reset_index(drop=True)
+
+
+def make_team_stats(seed=0):
+    """One row per team with standardized season stats, like fetch_nba_team_stats"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'TEAM_ID': FIRST_TEAM_ID + np.arange(N_TEAMS),
+        'TEAM_NAME': [f"Team {i}" for i in range(N_TEAMS)],
+    })
+    for column in STAT_COLUMNS:
+        df[column] = rng.standard_normal(N_TEAMS)
+    return df
@@ -1,116 +1,222 @@
-import joblib
-import pandas as pd
-
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-
-from src.cache_manager import CacheManager
-from src.data_collection.future_game_collector import create_game_data_df
-from src.data_collection.prepare_data import prepare_full_df
-from src.data_collection.previous_game_collector import identify_opponents, fetch_and_process_games
-from src.data_collection.season_stat_collector import fetch_nba_team_stats
-
-
-def main():
-    season = '2024-25'
-    cm = CacheManager()
-
-    # Try to get cached processed data
-    processed_key = f"processed_data_{season}"
-    combined_data = cm.get(processed_key)
-
-    if combined_data is None:
-        print("Cache miss - processing fresh data")
-
-        historical_key = f"historical_games_{season}"
-        historical_raw = cm.get_safe(historical_key)
-        fresh_dates = pd.date_range("2023-10-18", "2024-04-10")
-
-        if not historical_raw.empty:
-            cached_dates = pd.to_datetime(historical_raw['GAME_DATE'].unique())
-            missing_dates = [d for d in fresh_dates if d not in cached_dates]
-            if missing_dates:
-                print(f"Fetching {len(missing_dates)} missing dates")
-                new_data = fetch_and_process_games(
-                    start_date=missing_dates[0],
-                    end_date=missing_dates[-1]
-                )
-                historical_raw = pd.concat([historical_raw, new_data])
-
-        if historical_raw.empty:
-            historical_raw = fetch_and_process_games()
-
-        required_columns = ['GAME_ID', 'TEAM_ID']
-        missing = [col for col in required_columns if col not in historical_raw.columns]
-        if missing:
-            raise ValueError(f"Missing critical columns in raw data: {missing}")
-
-        stats_key = f"team_stats_{season}"
-        team_stats_df = cm.get(stats_key) or fetch_nba_team_stats(season)
+import argparse
+import inspect
+from concurrent.futures import ProcessPoolExecutor
 
-        game_data_df = create_game_data_df(historical_raw)
-
-        if game_data_df.empty:
-            raise ValueError("No game data available for processing")
-
-        opponents_df = identify_opponents(game_data_df)
-
-        combined_data = prepare_full_df(
-            game_data_df,
-            fetch_nba_team_stats(season),
-            opponents_df
-        )
+import numpy as np
+import pandas as pd
 
+from src.data_collection.previous_game_collector import DEFAULT_FETCH_WORKERS
+from src.data_collection.rate_limiter import set_process_share
+from src.data_collection.schema import write_dataset
+from src.data_collection.season_pipeline import season_pipeline
+from src.data_collection.season_stat_collector import TEAM_STATS_OFFSET, load_team_stats_scaler, team_stats_season
+from src.data_collection.streaming import dataset_files, iter_dataset, stream_to_dataset
+from src.instrumentation import get_registry, merge, report, reset, span, summary, write_prometheus, write_report
+from src.training.backends import BACKENDS, DEFAULT_BACKEND, compare_backends, handles_missing, make_model
+from src.training.matrix_store import MatrixStore, TrainingMatrix, file_digest, fingerprint
+from src.training.model_bundle import MODEL_FILE, make_bundle, save_bundle
+
+
+DEFAULT_SEASONS = ['2023-24']
+
+
+@span('build_season')
+def build_season(season, feature_mode='season', fetch_workers=DEFAULT_FETCH_WORKERS):
+    """
+    Combined feature rows for one season from the season pipeline, which only
+    re-runs the stages whose code, parameters or inputs changed since they were cached.
+    feature_mode 'season' joins whole-season team aggregates; 'rolling' joins
+    point-in-time season-to-date and last-N features from RollingTeamStats.
+    Missing scoreboard dates are fetched fetch_workers at a time.
+    """
+    pipeline = season_pipeline(season, feature_mode, fetch_workers=fetch_workers)
+    combined_data = pipeline.output('combined')
+    print(f"Season {season}: ran {', '.join(pipeline.ran)}" if pipeline.ran
+          else f"Season {season}: every stage cached")
+    return combined_data
+
+
+def build_training_set(seasons, feature_mode='season', max_workers=None, fetch_workers=DEFAULT_FETCH_WORKERS):
+    """
+    Builds every season in its own process and concatenates them in season order,
+    so the wall time is roughly that of the slowest season. Each process gets
+    1 / max_workers of the API request rate, so together they stay under it.
+    """
+    if len(seasons) == 1:
+        return build_season(seasons[0], feature_mode, fetch_workers)
+
+    # Season builds are mostly waiting on the stats API, so one process per season by default
+    max_workers = min(max_workers or len(seasons), len(seasons))
+    trace_memory = get_registry().trace_memory
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(build_season_worker, seasons, [feature_mode] * len(seasons),
+                                    [trace_memory] * len(seasons), [1 / max_workers] * len(seasons),
+                                    [fetch_workers] * len(seasons)))
+
+    # Worker timings and counters are folded into this run's report
+    for _, worker_report in results:
+        merge(worker_report)
+    return pd.concat([frame for frame, _ in results], ignore_index=True)
+
+
+def build_season_worker(season, feature_mode, trace_memory, rate_share=1.0, fetch_workers=DEFAULT_FETCH_WORKERS):
+    """build_season in a pool process, with that process's run report for the season"""
+    # Pool processes are reused across seasons, so each season starts a fresh report
+    reset(trace_memory)
+    set_process_share(rate_share)
+    combined_data = build_season(season, feature_mode, fetch_workers)
+    return combined_data, report()
+
+
+def main(seasons=None, feature_mode='season', max_workers=None, tune=False,
+         backend=DEFAULT_BACKEND, compare=False, stream_to=None, fetch_workers=DEFAULT_FETCH_WORKERS):
+    """
+    With stream_to, seasons are built chunk by chunk straight into a partitioned
+    parquet dataset at that directory, so building never holds more than one
+    chunk; only the finished training set is read back.
+    """
+    seasons = seasons or DEFAULT_SEASONS
+    if stream_to:
+        stream_to_dataset(seasons, stream_to, feature_mode, max_workers=fetch_workers)
+
+    matrix = load_training_matrix(seasons, feature_mode, max_workers, stream_to, fetch_workers=fetch_workers)
+    # float32 views over the memory-mapped matrix; nothing below copies them whole
+    X, y, groups = matrix.frame(), matrix.target(), matrix.groups
+
+    if compare:
+        # Same folds for every backend, so cost and accuracy are comparable
+        compare_backends(X, y, groups)
+        return
+
+    if tune:
+        from src.training.tuning import tune_forest
+
+        # Search on game-grouped folds; the winner is refit on every labelled row
+        with span('tune_forest'):
+            model, _ = tune_forest(X, y, groups)
     else:
-        print("Using cached processed data")
+        X_train, X_test, y_train, y_test = create_train_test_split(X, y, groups)
+
+        # Model training and evaluation
+        model = train_model(X_train, y_train, backend)
+        evaluate_model(model, X_test, y_test, matrix.feature_names)
+
+    # Check feature importances (tree ensembles with per-feature impurity only)
+    feature_importances = getattr(model, 'feature_importances_', None)
+    if feature_importances is not None:
+        feature_names = X.columns
+        importance_df = pd.DataFrame({'Feature': feature_names, 'Importance': feature_importances})
+        importance_df = importance_df.sort_values(by='Importance', ascending=False)
+        print("Feature importances:\n", importance_df)
+
+    # Team stats are z-scored per season; keep the parameters with the model
+    scalers = {}
+    if feature_mode == 'season':
+        stats_seasons = [team_stats_season(season) for season in seasons]
+        scalers = {season: load_team_stats_scaler(season) for season in stats_seasons}
+    bundle = make_bundle(model, X, 'forest' if tune else backend, feature_mode, seasons, scalers, TEAM_STATS_OFFSET)
+    save_bundle(bundle, MODEL_FILE)
+    print(f"Model bundle (v{bundle['version']}, {len(bundle['features'])} features) saved to {MODEL_FILE}")
+
+def training_matrix_key(seasons, feature_mode, stream_to=None):
+    """
+    Fingerprint of a training set's inputs: the digest of each season
+    pipeline's combined output (or the content of the streamed dataset's part
+    files) and the source of the code turning those rows into X and y.
+    None while any season still has stale stages.
+    """
+    code = [inspect.getsource(func) for func in (labelled_rows, prepare_features)]
+    if stream_to:
+        paths = dataset_files(stream_to, seasons)
+        if not paths:
+            return None
+        return fingerprint(list(seasons), feature_mode, [file_digest(path) for path in paths], code)
+
+    digests = [season_pipeline(season, feature_mode).cached_digest('combined') for season in seasons]
+    if None in digests:
+        return None
+    return fingerprint(list(seasons), feature_mode, digests, code)
+
+
+def load_training_matrix(seasons, feature_mode='season', max_workers=None, stream_to=None, store=None,
+                         fetch_workers=DEFAULT_FETCH_WORKERS):
+    """
+    X, y and GAME_ID groups for the seasons from the matrix store, memory-mapped.
+    When the fingerprinted inputs have no stored matrix yet, the training set is
+    built (or read back from stream_to), run through prepare_features and stored.
+    """
+    store = store or MatrixStore()
+    key = training_matrix_key(seasons, feature_mode, stream_to)
+    matrix = store.get(key) if key else None
+    if matrix is not None:
+        print(f"Training matrix: {len(matrix)} rows from seasons {', '.join(seasons)} (reused {matrix.path})")
+        return matrix
+
+    if stream_to:
+        if key is None:
+            raise ValueError(f"No streamed data for seasons {', '.join(seasons)} under {stream_to}")
+        # Part by part into the memory-mapped matrix; the dataset is never read back whole
+        rows = sum(len(labelled_rows(part)) for part in iter_dataset(stream_to, seasons, columns=['WL']))
+        print(f"Training set: {rows} labelled rows from seasons {', '.join(seasons)}")
+        return store.put_parts(key, streamed_training_parts(stream_to, seasons), rows)
+
+    combined_data = build_training_set(seasons, feature_mode, max_workers, fetch_workers)
 
     # Save combined data
-    combined_data.to_csv('combined_data.csv', index=False)
-    print("Combined data saved to combined_data.csv")
+    write_dataset(combined_data, 'combined_data.parquet')
+    print("Combined data saved to combined_data.parquet")
+    print(f"Training set: {len(combined_data)} rows from seasons {', '.join(seasons)}")
+
+    combined_data = labelled_rows(combined_data)
 
     # Feature engineering and target preparation
-    X, y, feature_cols = prepare_features(combined_data)
+    X, y, _ = prepare_features(combined_data)
+
+    # The season pipelines are cached by now even if they were not before
+    key = key or training_matrix_key(seasons, feature_mode, stream_to)
+    if key is None:
+        return TrainingMatrix(X.to_numpy(dtype='float32', na_value=float('nan')), y.to_numpy(dtype='int8'),
+                              combined_data['GAME_ID'].to_numpy(), X.columns)
+    return store.put(key, X, y, combined_data['GAME_ID'])
 
-    X_train, X_test, y_train, y_test = create_train_test_split(X, y, combined_data)
 
-    # Model training and evaluation
-    model = train_model(X_train, y_train)
-    evaluate_model(model, X_test, y_test, feature_cols)
+def streamed_training_parts(stream_to, seasons):
+    """(X, y, groups) for each part file of the streamed dataset, one part in memory at a time"""
+    for part in iter_dataset(stream_to, seasons):
+        part = labelled_rows(part)
+        X, y, _ = prepare_features(part)
+        yield X, y, part['GAME_ID']
 
-    # Check feature importances
-    feature_importances = model.feature_importances_
-    feature_names = X.columns
-    importance_df = pd.DataFrame({'Feature': feature_names, 'Importance': feature_importances})
-    importance_df = importance_df.sort_values(by='Importance', ascending=False)
-    print("Feature importances:\n", importance_df)
 
-    joblib.dump(model, 'nba_game_predictor.pkl')
-    print("Model saved to nba_game_predictor.pkl")
+def labelled_rows(combined_data):
+    # Ties and games missing their opponent row have no W/L label to learn from
+    return combined_data[combined_data['WL'].isin(['W', 'L'])].reset_index(drop=True)
+
 
 def prepare_features(combined_data):
-    drop_cols = ['GAME_ID', 'OPPONENT_TEAM_ID', 'TEAM_ID_opponent_game',
+    # Identifiers, the date and the label itself are never features
+    drop_cols = ['GAME_ID', 'GAME_DATE', 'WL', 'TEAM_ID', 'OPPONENT_TEAM_ID', 'TEAM_ID_opponent_game',
                  'TEAM_ID_opponent_season', 'TEAM_NAME', 'TEAM_NAME_team_game']
 
-    X = combined_data.drop(drop_cols, axis=1)
-    y = combined_data['WL'].map({'W': 1, 'L': 0})
+    X = combined_data.drop(drop_cols, axis=1, errors='ignore')
+    y = combined_data['WL'].astype(object).map({'W': 1, 'L': 0})
     feature_cols = X.columns.tolist()
 
     return X, y, feature_cols
 
 
-def create_train_test_split(X, y, combined_data):
-    game_ids = combined_data['GAME_ID'].unique()
+def create_train_test_split(X, y, groups):
+    from sklearn.model_selection import train_test_split
+
+    game_ids = pd.unique(np.asarray(groups))
     train_game_ids, test_game_ids = train_test_split(game_ids, test_size=0.2, random_state=42)
 
-    train_index = combined_data['GAME_ID'].isin(train_game_ids)
-    test_index = combined_data['GAME_ID'].isin(test_game_ids)
+    train_index = np.isin(groups, train_game_ids)
+    test_index = np.isin(groups, test_game_ids)
 
     X_train, X_test = X[train_index], X[test_index]
     y_train, y_test = y[train_index], y[test_index]
 
-    print("TRAIN columns:", X_train.columns.tolist())
-
     # Verify no overlapping game IDs
     train_game_ids_set = set(train_game_ids)
     test_game_ids_set = set(test_game_ids)
@@ -123,22 +229,24 @@ def create_train_test_split(X, y, combined_data):
     return X_train, X_test, y_train, y_test
 
 
-def train_model(X_train, y_train):
-    X_train_no_na = X_train.dropna()
-    y_train_no_na = y_train[X_train_no_na.index]
+@span('train_model')
+def train_model(X_train, y_train, backend=DEFAULT_BACKEND):
+    # hist_gb and logistic take NaN features as they are; the forest is fit on complete rows
+    if not handles_missing(backend):
+        complete = X_train.notna().all(axis=1).to_numpy()
+        if not complete.all():
+            X_train, y_train = X_train[complete], y_train[complete]
 
-    # TODO: Consider hyperparameter tuning here
-    model = RandomForestClassifier(
-        n_estimators=100,
-        max_depth=None,
-        min_samples_split=2,
-        random_state=42
-    )
-    model.fit(X_train_no_na, y_train_no_na)
+    # Tuned forest parameters come from `main.py --tune` (src/training/tuning.py)
+    model = make_model(backend)
+    model.fit(X_train, y_train)
     return model
 
 
+@span('evaluate_model')
 def evaluate_model(model, X_test, y_test, feature_cols):
+    from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+
     # TODO: Consider handling missing values in test data consistently
     y_pred = model.predict(X_test)
     y_proba = model.predict_proba(X_test)
@@ -157,5 +265,40 @@ def evaluate_model(model, X_test, y_test, feature_cols):
         'confusion_matrix': conf_matrix,
     }
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the training set and fit the game predictor")
+    parser.add_argument('--seasons', nargs='+', default=DEFAULT_SEASONS,
+                        help="Seasons to train on, e.g. 2021-22 2022-23 2023-24")
+    parser.add_argument('--feature-mode', choices=['season', 'rolling'], default='season')
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Processes used to build seasons (default: one per season)")
+    parser.add_argument('--fetch-workers', type=int, default=DEFAULT_FETCH_WORKERS,
+                        help="Scoreboard dates each season build fetches at once; "
+                             "all of them share the request rate limit")
+    parser.add_argument('--tune', action='store_true',
+                        help="Successive-halving hyperparameter search instead of the fixed forest")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=DEFAULT_BACKEND)
+    parser.add_argument('--compare-backends', action='store_true',
+                        help="Report fit time, predict latency, artifact size and accuracy per backend, then exit")
+    parser.add_argument('--stream-to', default=None, metavar='DIR',
+                        help="Build seasons in date chunks into a season-partitioned parquet dataset here "
+                             "(bounded memory for long backfills) instead of the per-season cache")
+    parser.add_argument('--report', default=None, help="Write the run's stage timings and counters here as JSON")
+    parser.add_argument('--prometheus', default=None, help="Also write them in Prometheus text format")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Track each stage's peak allocations with tracemalloc (slower)")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    reset(args.trace_memory or None)
+    try:
+        main(args.seasons, args.feature_mode, args.workers, args.tune, args.backend, args.compare_backends,
+             args.stream_to, args.fetch_workers)
+    finally:
+        print(summary())
+        if args.report:
+            write_report(args.report)
+        if args.prometheus:
+            write_prometheus(args.prometheus)
\ No newline at end of file
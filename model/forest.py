@@ -1,20 +1,12 @@
 import pandas as pd
 
+from src.data_collection.result_sets import result_set_frame
+
 
 # Averages the value in a dataframe
 def create_average_dataframe(df):
-    # Get the response as a dictionary
-    data = df.get_normalized_dict()
-
-    # Extract the relevant information
-    headers = data['headers']
-    row_set = data['rowSet']
-
-    # Create a DataFrame using the headers and row set
-    df = pd.DataFrame(row_set, columns=headers)
-
-    # Calculate the averages for each column
-    averages = df.mean()
+    # Calculate the averages for each numeric column
+    averages = df.mean(numeric_only=True)
 
     # Create a new DataFrame with the averages
     avg_df = pd.DataFrame(averages).T
@@ -28,7 +20,7 @@ class Forest:
         self.log = log
 
     def create_dataframe(self):
-        results = self.log['resultSets'][1]
-        df = pd.DataFrame(results['rowSet'], columns=results['headers'])
+        # Second result set of the game log payload, decoded straight into columns
+        df = result_set_frame(self.log, 1)
         avg_df = create_average_dataframe(df)
         return avg_df
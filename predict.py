@@ -1,59 +1,190 @@
-from datetime import date
+import argparse
+import os
 
-import joblib
+import numpy as np
+import pandas as pd
 
-from src.data_collection.future_game_collector import fetch_games_for_date, create_game_data_df
-from src.data_collection.prepare_data import prepare_full_df
-from src.data_collection.previous_game_collector import identify_opponents
-from src.data_collection.season_stat_collector import fetch_nba_team_stats
+from src.data_collection.future_game_collector import create_game_data_df
+from src.data_collection.game_store import HistoricalGameStore
+from src.data_collection.prepare_data import prepare_full_df, prepare_point_in_time_df
+from src.data_collection.previous_game_collector import DEFAULT_FETCH_WORKERS, fetch_dates, identify_opponents
+from src.data_collection.rolling_team_stats import engine_for_date
+from src.data_collection.schema import format_game_id
+from src.data_collection.season_stat_collector import team_stats_for_games
+from src.data_collection.seasons import season_date_range, season_for_date
+from src.instrumentation import count, reset, span, summary, write_prometheus, write_report
+from src.training.model_bundle import MODEL_FILE, estimator_for, load_bundle, project_features
 
+WRITE_CHUNK_ROWS = 50_000
 
-def main():
-    previous_season = '2023-24'
-    game_date = date.today()
-    team_stats_df = fetch_nba_team_stats(previous_season)
-    scoreboard_df = fetch_games_for_date(game_date)
+PREDICTION_COLUMNS = ['GAME_ID', 'GAME_DATE', 'SEASON', 'TEAM_ID', 'OPPONENT_TEAM_ID', 'IS_HOME', 'WL',
+                      'WIN_PROBABILITY', 'Predicted_Outcome']
 
+
+def main(feature_mode=None, model_path=MODEL_FILE, start_date=None, end_date=None, season=None, output=None):
+    """
+    Predicts every game from start_date to end_date (default: today only), or a
+    whole season. Results go to output (.parquet or .csv) when given, else stdout.
+    """
+    bundle = load_bundle(model_path)
+    print(f"Model bundle v{bundle['version']} loaded from {model_path}")
+    # The features have to be built the way the model was trained
+    feature_mode = feature_mode or bundle['feature_mode'] or 'season'
+
+    if season is not None:
+        start_date, end_date = season_date_range(season)
+    start_date = pd.Timestamp(start_date or pd.Timestamp.today()).normalize()
+    end_date = pd.Timestamp(end_date or start_date).normalize()
+
+    predictions = predict_games(bundle, feature_mode, start_date, end_date)
+    if predictions.empty:
+        print(f"No games scheduled or data unavailable for {start_date.date()} - {end_date.date()}.")
+        return predictions
+
+    if output:
+        write_predictions(predictions, output)
+        print(f"{len(predictions)} predictions written to {output}")
+    else:
+        print(f"Predictions for Games on {start_date.date()} - {end_date.date()}:")
+        print(predictions)
+
+    # Backfills over played games double as an evaluation
+    played = predictions['WL'].isin(['W', 'L'])
+    if played.any():
+        accuracy = (predictions.loc[played, 'WL'] == predictions.loc[played, 'Predicted_Outcome']).mean()
+        print(f"Accuracy on {played.sum()} played team rows: {accuracy:.4f}")
+    return predictions
+
+
+def predict_games(bundle, feature_mode, start_date, end_date):
+    """One feature matrix and a single predict_proba call for every game in the range"""
+    scoreboard_df = gather_games(start_date, end_date)
     if scoreboard_df.empty:
-        print(f"No games scheduled or data unavailable for {game_date}.")
-        return
+        return pd.DataFrame(columns=PREDICTION_COLUMNS)
 
     game_data_df = create_game_data_df(scoreboard_df)
+    game_dates = game_data_df['GAME_DATE']
+    game_data_df['SEASON'] = game_dates.map({day: season_for_date(day) for day in game_dates.unique()})
     opponents_df = identify_opponents(game_data_df)
 
-    combined_data = prepare_full_df(game_data_df, team_stats_df, opponents_df)
-
-    X_specific_date = combined_data.drop(
-        [
-            'GAME_DATE',
-            'GAME_ID',
-            'MATCHUP',
-            'MIN',
-            'OPPONENT_TEAM_ID',
-            'TEAM_ABBREVIATION',
-            'TEAM_ID_opponent_game',
-            'TEAM_ID_opponent_season',
-            'TEAM_ID_x',
-            'TEAM_ID_y',
-            'TEAM_NAME',
-            'TEAM_NAME_team_game',
-            'TEAM_NAME_team_season',
-            'VIDEO_AVAILABLE',
-            'WL',
-            'PLUS_MINUS'
-        ], axis=1, errors='ignore')
-    model = joblib.load('nba_game_predictor.pkl')
-    print("Model loaded from nba_game_predictor.pkl")
-
-    print("PREDICT columns:", X_specific_date.columns.tolist())
-
-    predictions = model.predict(X_specific_date)
-
-    combined_data['Predicted_Outcome'] = predictions
-    combined_data['Predicted_Outcome'] = combined_data['Predicted_Outcome'].map({1: 'W', 0: 'L'})
-
-    print(f"Predictions for Games on {game_date}:")
-    print(combined_data[['GAME_ID', 'GAME_DATE', 'MATCHUP', 'Predicted_Outcome']])
+    if feature_mode == 'rolling':
+        combined_data = prepare_point_in_time_df(game_data_df, opponents_df, rolling_features(game_data_df))
+    else:
+        # The training rule for which season's stats a game joins, and its scalers
+        team_stats_df = team_stats_for_games(game_data_df['SEASON'].unique(), bundle['team_stats_offset'],
+                                             bundle['team_stats_scalers'])
+        combined_data = prepare_full_df(game_data_df, team_stats_df, opponents_df)
+
+    # Same columns, order and dtypes the model was trained on
+    estimator = estimator_for(bundle, len(combined_data))
+    with span('predict'):
+        proba = estimator.predict_proba(project_features(bundle, combined_data))
+    count('predicted_rows', len(combined_data))
+    win_probability = proba[:, list(estimator.classes_).index(1)].astype('float32')
+
+    # Both feature builders keep game_data_df's row order
+    predictions = game_data_df[['GAME_ID', 'GAME_DATE', 'SEASON', 'TEAM_ID']].copy()
+    # Zero-padded like the API's (and the prediction service's) game ids
+    predictions['GAME_ID'] = format_game_id(game_data_df['GAME_ID']).to_numpy()
+    predictions['OPPONENT_TEAM_ID'] = combined_data['OPPONENT_TEAM_ID'].array
+    predictions['IS_HOME'] = game_data_df['IS_HOME'] if 'IS_HOME' in game_data_df.columns else pd.NA
+    predictions['WL'] = game_data_df['WL']
+    predictions['WIN_PROBABILITY'] = win_probability
+    predictions['Predicted_Outcome'] = np.where(win_probability >= 0.5, 'W', 'L')
+    return predictions
+
+
+def gather_games(start_date, end_date, max_workers=DEFAULT_FETCH_WORKERS):
+    """
+    Scoreboard rows for every game in the range: finished days come from the
+    game store (only missing dates are fetched), today and later from the live
+    scoreboard.
+    """
+    today = pd.Timestamp.today().normalize()
+    frames = []
+    if start_date < today:
+        last_final = min(end_date, today - pd.Timedelta(days=1))
+        game_store = HistoricalGameStore()
+        game_store.update(start_date, last_final, max_workers=max_workers)
+        frames.append(game_store.load(start_date, last_final))
+
+    upcoming = pd.date_range(max(start_date, today), end_date)
+    if len(upcoming):
+        frames.extend(df for df in fetch_dates(upcoming, max_workers=max_workers) if df is not None)
+
+    frames = [df for df in frames if not df.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def rolling_features(game_data_df):
+    """
+    Pre-game rolling features for every game row: played games from the season
+    engine's history, scheduled ones as of the day they are played.
+    """
+    today = pd.Timestamp.today().normalize()
+    frames = []
+    for season, games in game_data_df.groupby('SEASON', sort=True):
+        last_date = games['GAME_DATE'].max()
+        engine = engine_for_date(min(last_date + pd.Timedelta(days=1), today))
+        if (games['GAME_DATE'] < today).any():
+            frames.append(engine.training_features())
+        for game_date, day_games in games[games['GAME_DATE'] >= today].groupby('GAME_DATE'):
+            frames.append(engine.features_for_games(day_games, game_date))
+    return pd.concat(frames, ignore_index=True)
+
+
+def write_predictions(predictions, path, chunk_rows=WRITE_CHUNK_ROWS):
+    """Writes predictions to .parquet or .csv in row chunks"""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    if path.endswith('.csv'):
+        for start in range(0, len(predictions), chunk_rows):
+            predictions.iloc[start:start + chunk_rows].to_csv(path, mode='w' if start == 0 else 'a',
+                                                              header=start == 0, index=False)
+        return
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # An empty frame types object columns as null; they all hold strings (or nothing)
+    schema = pa.Schema.from_pandas(predictions.iloc[:0], preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+    with pq.ParquetWriter(path, schema) as writer:
+        for start in range(0, len(predictions), chunk_rows):
+            chunk = predictions.iloc[start:start + chunk_rows]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Predict game outcomes for a day, a date range or a season")
+    parser.add_argument('--date', default=None, help="Single game date (default: today)")
+    parser.add_argument('--start', default=None, help="First date of a range, YYYY-MM-DD")
+    parser.add_argument('--end', default=None, help="Last date of a range (default: --start)")
+    parser.add_argument('--season', default=None, help="Whole season, e.g. 2023-24")
+    parser.add_argument('--output', default=None, help="Write predictions to this .parquet or .csv file")
+    parser.add_argument('--feature-mode', choices=['season', 'rolling'], default=None,
+                        help="Defaults to the mode the model was trained with")
+    parser.add_argument('--model', default=MODEL_FILE)
+    parser.add_argument('--report', default=None, help="Write the run's stage timings and counters here as JSON")
+    parser.add_argument('--prometheus', default=None, help="Also write them in Prometheus text format")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Track each stage's peak allocations with tracemalloc (slower)")
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    reset(args.trace_memory or None)
+    try:
+        main(args.feature_mode, args.model, args.start or args.date, args.end or args.date, args.season,
+             args.output)
+    finally:
+        if args.report or args.prometheus:
+            print(summary())
+        if args.report:
+            write_report(args.report)
+        if args.prometheus:
+            write_prometheus(args.prometheus)
@@ -0,0 +1,29 @@
+import argparse
+
+from src.data_collection.http_transport import configure_transport
+from src.serving.prediction_service import (
+    DEFAULT_HOST, DEFAULT_MAX_WAIT_SECONDS, DEFAULT_PORT, DEFAULT_REFRESH_SECONDS, PredictionService, serve
+)
+from src.training.model_bundle import MODEL_FILE
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve game predictions over HTTP with the model kept in memory")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--model', default=MODEL_FILE)
+    parser.add_argument('--refresh-seconds', type=float, default=DEFAULT_REFRESH_SECONDS,
+                        help="How often the model, team features and today's scoreboard are reloaded")
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_SECONDS * 1000,
+                        help="How long a request waits for others to share its predict_proba call")
+    parser.add_argument('--stats-base-url', default=None,
+                        help="Stats API URL template, e.g. a local stand-in: http://127.0.0.1:9000/stats/{endpoint}")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.stats_base_url:
+        configure_transport(base_url=args.stats_base_url)
+    service = PredictionService(args.model, args.refresh_seconds, max_wait=args.max_wait_ms / 1000)
+    serve(service, args.host, args.port)
@@ -1,28 +1,220 @@
+import json
 import os
+import threading
+import time
+from collections import OrderedDict
+
 import pandas as pd
-from datetime import datetime
+
+from src.file_io import atomic_write, file_lock, write_json
+from src.instrumentation import count
+
+INDEX_FILE = "_cache_index.json"
+INDEX_LOCK_FILE = "_cache_index.lock"
 
 
 class CacheManager:
-    def __init__(self, cache_dir="cache", default_ttl=86400):
+    """
+    Two-tier DataFrame cache: an in-process LRU in front of parquet files on disk.
+
+    Every key carries its own TTL (seconds, default_ttl unless set() overrides it).
+    When max_bytes is set, the least recently used parquet files are evicted once
+    the disk tier grows past it. Frames returned by get() are shared with the
+    memory tier and should be treated as read-only. Processes sharing a cache
+    dir update its index under a file lock, so none of their entries are lost.
+    """
+
+    def __init__(self, cache_dir="cache", default_ttl=86400, max_bytes=None, memory_items=16):
         self.cache_dir = cache_dir
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
         os.makedirs(cache_dir, exist_ok=True)
 
-    def get(self, key, ttl_hours=24):
-        path = os.path.join(self.cache_dir, f"{key}.parquet")
-        if os.path.exists(path):
-            file_age = datetime.now() - datetime.fromtimestamp(os.path.getmtime(path))
-            if file_age.total_seconds() < ttl_hours * 3600:
-                return pd.read_parquet(path)
-        return None
+        self._memory = OrderedDict()  # key -> (DataFrame, expires_at)
+        self._lock = threading.RLock()
+        self._index = self._load_index()
+        self._stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'evictions': 0,
+            'memory_evictions': 0,
+        }
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, INDEX_FILE)
+
+    def _index_lock(self):
+        return file_lock(os.path.join(self.cache_dir, INDEX_LOCK_FILE))
+
+    def _load_index(self):
+        try:
+            with open(self._index_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _refresh_index(self):
+        """Other processes may share the cache dir; merge their index with our access times"""
+        index = self._load_index()
+        for key, entry in index.items():
+            ours = self._index.get(key)
+            if ours is not None and ours['written_at'] == entry['written_at']:
+                entry['accessed_at'] = max(entry['accessed_at'], ours['accessed_at'])
+        self._index = index
+
+    def _save_index(self):
+        write_json(self._index_path(), self._index)
 
-    def get_safe(self, key, ttl=None):
-        """Get cached data or empty DataFrame if corrupt"""
+    def _expires_at(self, key, path):
+        entry = self._index.get(key)
+        if entry is not None:
+            return entry['expires_at']
+        # Files written before the index existed expire default_ttl after their mtime
+        return os.path.getmtime(path) + self.default_ttl
+
+    def get(self, key, ttl_hours=None):
+        """
+        Cached frame for key, or None when missing or expired.
+        ttl_hours optionally tightens the key's own TTL for this read.
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                data, expires_at = cached
+                if now < expires_at and self._fresh_enough(key, ttl_hours, now):
+                    self._memory.move_to_end(key)
+                    self._touch(key, now)
+                    self._stats['memory_hits'] += 1
+                    count('cache_hits', cache='cache_manager', tier='memory')
+                    return data
+                del self._memory[key]
+
+            path = self._path(key)
+            if not os.path.exists(path):
+                self._stats['misses'] += 1
+                count('cache_misses', cache='cache_manager')
+                return None
+
+            expires_at = self._expires_at(key, path)
+            if now >= expires_at:
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                count('cache_misses', cache='cache_manager', reason='expired')
+                self.delete(key)
+                return None
+            if not self._fresh_enough(key, ttl_hours, now, path):
+                self._stats['misses'] += 1
+                count('cache_misses', cache='cache_manager', reason='stale')
+                return None
+
+            data = pd.read_parquet(path)
+            self._remember(key, data, expires_at)
+            self._touch(key, now)
+            self._stats['disk_hits'] += 1
+            count('cache_hits', cache='cache_manager', tier='disk')
+            return data
+
+    def _fresh_enough(self, key, ttl_hours, now, path=None):
+        if ttl_hours is None:
+            return True
+        entry = self._index.get(key)
+        if entry is not None:
+            written_at = entry['written_at']
+        elif path is not None:
+            written_at = os.path.getmtime(path)
+        else:
+            return True
+        return now - written_at < ttl_hours * 3600
+
+    def fresh_path(self, key):
+        """Parquet file behind key when it is on disk and not expired, else None"""
+        path = self._path(key)
+        with self._lock:
+            if not os.path.exists(path) or time.time() >= self._expires_at(key, path):
+                return None
+        return path
+
+    def get_safe(self, key, ttl_hours=None):
+        """Get cached data or empty DataFrame if missing or corrupt"""
         try:
-            return self.get(key, ttl) or pd.DataFrame()
-        except:
-            return pd.DataFrame()
+            data = self.get(key, ttl_hours)
+        except Exception as e:
+            print(f"Discarding unreadable cache entry {key}: {e}")
+            self.delete(key)
+            data = None
+        return data if data is not None else pd.DataFrame()
+
+    def set(self, key, data, ttl=None):
+        """Cache data under key for ttl seconds (default_ttl when None)"""
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        path = self._path(key)
+        with self._lock, self._index_lock():
+            atomic_write(path, lambda tmp: data.to_parquet(tmp))
+            self._refresh_index()
+            self._index[key] = {
+                'written_at': now,
+                'accessed_at': now,
+                'expires_at': now + ttl,
+                'size': os.path.getsize(path),
+            }
+            self._remember(key, data, now + ttl)
+            self._evict_to_size()
+            self._save_index()
+
+    def delete(self, key):
+        with self._lock, self._index_lock():
+            self._memory.pop(key, None)
+            path = self._path(key)
+            if os.path.exists(path):
+                os.remove(path)
+            self._refresh_index()
+            if self._index.pop(key, None) is not None:
+                self._save_index()
+
+    def stats(self):
+        """Counters plus current tier sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['hits'] = stats['memory_hits'] + stats['disk_hits']
+            stats['memory_entries'] = len(self._memory)
+            stats['disk_entries'] = len(self._index)
+            stats['disk_bytes'] = sum(entry['size'] for entry in self._index.values())
+            return stats
+
+    def _touch(self, key, now):
+        entry = self._index.get(key)
+        if entry is not None:
+            entry['accessed_at'] = now
+
+    def _remember(self, key, data, expires_at):
+        self._memory[key] = (data, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+            self._stats['memory_evictions'] += 1
+            count('cache_evictions', cache='cache_manager', tier='memory')
 
-    def set(self, key, data):
-        path = os.path.join(self.cache_dir, f"{key}.parquet")
-        data.to_parquet(path)
\ No newline at end of file
+    def _evict_to_size(self):
+        if self.max_bytes is None:
+            return
+        total = sum(entry['size'] for entry in self._index.values())
+        by_age = sorted(self._index.items(), key=lambda item: item[1]['accessed_at'])
+        for key, entry in by_age:
+            if total <= self.max_bytes:
+                break
+            self._memory.pop(key, None)
+            path = self._path(key)
+            if os.path.exists(path):
+                os.remove(path)
+            del self._index[key]
+            total -= entry['size']
+            self._stats['evictions'] += 1
+            count('cache_evictions', cache='cache_manager', tier='disk')
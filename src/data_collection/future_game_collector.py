@@ -1,150 +1,122 @@
-import json
-
+import numpy as np
 import pandas as pd
+from pandas.api.extensions import take
 
-from nba_api.stats.endpoints import scoreboardv2
-
-
-def fetch_games_for_date(date):
-    try:
-        date_str = date.strftime('%m/%d/%Y')  # NBA API expects MM/DD/YYYY format
-        print(f"Fetching data for {date_str}")
-
-        # Try the normal API call first
-        try:
-            scoreboard = scoreboardv2.ScoreboardV2(
-                game_date=date_str,
-                league_id='00',
-                day_offset=0
-            )
-            response = json.loads(scoreboard.get_json())
-
-        except KeyError as e:
-            if 'WinProbability' in str(e):
-                print(f"WinProbability KeyError for {date_str} - this is expected for dates before April 10, 2025")
-                # For historical dates, we need to use a different approach
-                return fetch_games_historical_method(date, date_str)
-            else:
-                # Some other KeyError, re-raise it
-                raise e
-
-        # If we get here, the normal API call worked
-        result_sets = response.get('resultSets', [])
-        print(f"Available result sets: {[rs['name'] for rs in result_sets]}")
-
-        line_score = next((rs for rs in result_sets if rs['name'] == 'LineScore'), None)
-        game_header = next((rs for rs in result_sets if rs['name'] == 'GameHeader'), None)
-
-        if not game_header or not line_score:
-            print(f"Incomplete data for {date_str}")
-            return pd.DataFrame()
-
-        if not line_score['rowSet'] or not game_header['rowSet']:
-            print(f"No games found for {date_str}")
-            return pd.DataFrame()
-
-        # Create DataFrames
-        game_header_df = pd.DataFrame(game_header['rowSet'], columns=game_header['headers'])
-        line_score_df = pd.DataFrame(line_score['rowSet'], columns=line_score['headers'])
-
-        # Merge to get home/away context
-        merged_df = line_score_df.merge(
-            game_header_df[['GAME_ID', 'HOME_TEAM_ID', 'VISITOR_TEAM_ID']],
-            on='GAME_ID',
-            how='left'
-        )
-
-        merged_df['IS_HOME'] = merged_df['TEAM_ID'] == merged_df['HOME_TEAM_ID']
-        merged_df['GAME_DATE'] = pd.to_datetime(date.strftime('%Y-%m-%d'))
+from src.data_collection.http_transport import get_endpoint_kwargs
+from src.data_collection.response_store import ReplayMissError, get_response_store
+from src.data_collection.result_sets import decode_columns, find_result_set, request_payload
+from src.data_collection.schema import GAME_DATA_SCHEMA, apply_schema
+from src.instrumentation import count, span
 
-        print(f"Successfully fetched {len(merged_df)} rows for {date_str}")
-        return merged_df
 
-    except Exception as e:
-        print(f"Error fetching {date_str}: {str(e)}")
-        return pd.DataFrame()
+SCOREBOARD_ENDPOINT = 'scoreboardV2'
+# GameHeader GAME_STATUS_ID values
+IN_PROGRESS_GAME_STATUS = 2
+FINAL_GAME_STATUS = 3
 
 
-def fetch_games_historical_method(date, date_str):
+def fetch_games_for_date(date, raise_errors=False, rate_limiter=None):
     """
-    Alternative method for fetching historical games (pre-April 10, 2025)
-    Uses direct HTTP requests to bypass the nba_api library's WinProbability requirement
+    LineScore rows for every game on date; empty when there are no games.
+    Request errors return an empty frame too unless raise_errors is set, which
+    lets callers tell an off-day from a failed fetch. rate_limiter, when given,
+    is acquired only for requests that actually go to the API.
     """
     try:
-        import requests
-
-        print(f"Using historical method for {date_str}")
-
-        # Direct NBA API call
-        url = "https://stats.nba.com/stats/scoreboardV2"
-
-        headers = {
-            'Accept': 'application/json, text/plain, */*',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Referer': 'https://www.nba.com/',
-            'Connection': 'keep-alive',
-        }
+        date_str = date.strftime('%m/%d/%Y')  # NBA API expects MM/DD/YYYY format
 
         params = {
-            'GameDate': date_str,  # MM/DD/YYYY format
+            'GameDate': date_str,
             'LeagueID': '00',
-            'DayOffset': '0'
+            'DayOffset': 0
         }
+        # Served from the raw response store when this date was recorded before.
+        # Today and later always go to the API: those scoreboards are still changing
+        is_past = pd.Timestamp(date).normalize() < pd.Timestamp.today().normalize()
+
+        def fetcher():
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            return request_scoreboard(date_str)
+
+        response = get_response_store().fetch(
+            SCOREBOARD_ENDPOINT, params, fetcher,
+            ttl=None if is_past else 0, final=scoreboard_is_final
+        )
+        return scoreboard_frame(response, date, date_str)
 
-        response = requests.get(url, headers=headers, params=params, timeout=30)
-
-        if response.status_code != 200:
-            print(f"HTTP error {response.status_code} for {date_str}")
-            return pd.DataFrame()
+    except ReplayMissError:
+        raise
 
-        data = response.json()
-        result_sets = data.get('resultSets', [])
+    except Exception as e:
+        if raise_errors:
+            raise
+        print(f"Error fetching {date_str}: {str(e)}")
+        return pd.DataFrame()
 
-        if not result_sets:
-            print(f"No result sets found for {date_str}")
-            return pd.DataFrame()
 
-        line_score = next((rs for rs in result_sets if rs.get('name') == 'LineScore'), None)
-        game_header = next((rs for rs in result_sets if rs.get('name') == 'GameHeader'), None)
+def scoreboard_is_final(payload):
+    """Whether every game on a ScoreboardV2 payload has finished (true for off-days)"""
+    game_header = find_result_set(payload, 'GameHeader')
+    if not game_header:
+        return False
+    if not game_header.get('rowSet'):
+        return True
+    statuses = decode_columns(game_header, ['GAME_STATUS_ID'])['GAME_STATUS_ID']
+    return bool(np.all(statuses == FINAL_GAME_STATUS))
 
-        if not line_score or not game_header:
-            print(f"Required result sets missing for {date_str}")
-            return pd.DataFrame()
 
-        if not line_score.get('rowSet') or not game_header.get('rowSet'):
-            print(f"No games found for {date_str}")
-            return pd.DataFrame()
+def request_scoreboard(date_str):
+    """
+    Raw ScoreboardV2 payload from the API, raising on failure.
+    The body is decoded once here instead of by nba_api, whose parsing also
+    insists on a WinProbability set that dates before April 10, 2025 lack.
+    """
+    from nba_api.stats.endpoints import scoreboardv2
 
-        # Create DataFrames (same logic as before)
-        game_header_df = pd.DataFrame(game_header['rowSet'], columns=game_header['headers'])
-        line_score_df = pd.DataFrame(line_score['rowSet'], columns=line_score['headers'])
+    count('api_calls', endpoint=SCOREBOARD_ENDPOINT)
+    scoreboard = scoreboardv2.ScoreboardV2(
+        game_date=date_str,
+        league_id='00',
+        day_offset=0,
+        get_request=False,
+        **get_endpoint_kwargs()
+    )
+    return request_payload(scoreboard)
 
-        merged_df = line_score_df.merge(
-            game_header_df[['GAME_ID', 'HOME_TEAM_ID', 'VISITOR_TEAM_ID']],
-            on='GAME_ID',
-            how='left'
-        )
 
-        merged_df['IS_HOME'] = merged_df['TEAM_ID'] == merged_df['HOME_TEAM_ID']
-        merged_df['GAME_DATE'] = pd.to_datetime(date.strftime('%Y-%m-%d'))
+def scoreboard_frame(response, date, date_str):
+    """
+    Builds the per-team LineScore frame, with home/away context from GameHeader
+    """
+    line_score = find_result_set(response, 'LineScore')
+    game_header = find_result_set(response, 'GameHeader')
 
-        print(f"Historical method: Successfully fetched {len(merged_df)} rows for {date_str}")
-        return merged_df
+    if not game_header or not line_score:
+        print(f"Incomplete data for {date_str}")
+        return pd.DataFrame()
 
-    except Exception as e:
-        print(f"Error in historical method for {date_str}: {e}")
+    if not line_score.get('rowSet') or not game_header.get('rowSet'):
+        # Off-day
         return pd.DataFrame()
 
+    merged_df = pd.DataFrame(decode_columns(line_score), copy=False)
 
-def is_historical_date(date):
-    """
-    Check if a date is before the WinProbability field was added
-    """
-    cutoff_date = pd.Timestamp('2025-04-10')
-    return pd.Timestamp(date) < cutoff_date
+    # Home/away context: each LineScore row looks up its game's GameHeader row
+    # (the first one, should the header repeat a game)
+    header = decode_columns(game_header, ['GAME_ID', 'HOME_TEAM_ID', 'VISITOR_TEAM_ID', 'GAME_STATUS_ID'])
+    header_ids = pd.Index(header['GAME_ID'])
+    first = ~header_ids.duplicated()
+    header_pos = header_ids[first].get_indexer(merged_df['GAME_ID'])
+    for column in ['HOME_TEAM_ID', 'VISITOR_TEAM_ID', 'GAME_STATUS_ID']:
+        merged_df[column] = take(header[column][first], header_pos, allow_fill=True)
 
+    merged_df['IS_HOME'] = merged_df['TEAM_ID'] == merged_df['HOME_TEAM_ID']
+    merged_df['GAME_DATE'] = pd.to_datetime(date.strftime('%Y-%m-%d'))
+    return merged_df
 
+
+@span('create_game_data_df')
 def create_game_data_df(scoreboard_df):
     """
     Creates a unified game data DataFrame with team-specific statistics.
@@ -161,42 +133,37 @@ def create_game_data_df(scoreboard_df):
         return pd.DataFrame()
 
     # Create a copy of relevant columns plus PTS for WL calculation
-    game_data = scoreboard_df[base_required_columns + ['GAME_DATE']].copy()
-
-    # Derive WL from PTS by comparing scores within each game
-    # Group by game to compare scores
-    game_results = []
-
-    for game_id, game_group in scoreboard_df.groupby('GAME_ID'):
-        if len(game_group) == 2:  # Ensure we have exactly 2 teams per game
-            team1, team2 = game_group.iloc[0], game_group.iloc[1]
-
-            # Determine winner and loser
-            if team1['PTS'] > team2['PTS']:
-                team1_wl, team2_wl = 'W', 'L'
-            elif team1['PTS'] < team2['PTS']:
-                team1_wl, team2_wl = 'L', 'W'
-            else:
-                team1_wl, team2_wl = 'T', 'T'  # Tie (rare in NBA)
-
-            # Add results
-            game_results.append({'GAME_ID': game_id, 'TEAM_ID': team1['TEAM_ID'], 'WL': team1_wl})
-            game_results.append({'GAME_ID': game_id, 'TEAM_ID': team2['TEAM_ID'], 'WL': team2_wl})
+    game_data = scoreboard_df[base_required_columns + ['GAME_DATE']].reset_index(drop=True)
+    game_data['WL'] = derive_wl(scoreboard_df['GAME_ID'], scoreboard_df['PTS'])
 
-    wl_df = pd.DataFrame(game_results)
-    game_data = game_data.merge(wl_df, on=['GAME_ID', 'TEAM_ID'], how='left')
+    # Optional columns are copied positionally, row for row
+    for column in ['TOV', 'FG3_PCT', 'FT_PCT', 'IS_HOME']:
+        if column in scoreboard_df.columns:
+            game_data[column] = scoreboard_df[column].to_numpy()
 
-    if 'TOV' in scoreboard_df.columns:
-        game_data['TOV'] = scoreboard_df['TOV']
+    return apply_schema(game_data, GAME_DATA_SCHEMA)
 
-    if 'FG3_PCT' in scoreboard_df.columns:
-        game_data['FG3_PCT'] = scoreboard_df['FG3_PCT']
 
-    if 'FT_PCT' in scoreboard_df.columns:
-        game_data['FT_PCT'] = scoreboard_df['FT_PCT']
-
-        # Add home/away indicator if available
-    if 'IS_HOME' in scoreboard_df.columns:
-        game_data['IS_HOME'] = scoreboard_df['IS_HOME']
-
-    return game_data
\ No newline at end of file
+@span('derive_wl')
+def derive_wl(game_ids, pts):
+    """
+    W/L/T per row by comparing PTS within each GAME_ID.
+    Games without exactly two teams get NaN. A tie is any game where neither
+    score is greater, which includes missing scores.
+    """
+    pts = pd.to_numeric(pts, errors='coerce').reset_index(drop=True)
+    game_ids = game_ids.reset_index(drop=True)
+    by_game = pts.groupby(game_ids)
+
+    team_count = by_game.transform('size').to_numpy()
+    high = by_game.transform('max').to_numpy()
+    low = by_game.transform('min').to_numpy()
+    values = pts.to_numpy()
+
+    with np.errstate(invalid='ignore'):
+        decided = high > low
+        won = values == high
+
+    wl = np.where(decided, np.where(won, 'W', 'L'), 'T').astype(object)
+    wl[team_count != 2] = np.nan
+    return wl
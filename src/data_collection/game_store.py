@@ -0,0 +1,148 @@
+import glob
+import json
+import os
+import time
+
+import pandas as pd
+
+from src.data_collection.future_game_collector import IN_PROGRESS_GAME_STATUS
+from src.data_collection.previous_game_collector import DEFAULT_REQUESTS_PER_SECOND, fetch_dates
+from src.data_collection.seasons import season_for_date
+from src.file_io import atomic_write, write_json
+from src.instrumentation import span
+
+STORE_DIR = os.path.join("cache", "games")
+MANIFEST_FILE = "manifest.json"
+
+FETCHED = 'fetched'
+EMPTY = 'empty'
+FAILED = 'failed'
+
+
+class HistoricalGameStore:
+    """
+    Append-only store of scoreboard rows, one parquet partition per game date:
+    {store_dir}/season=2023-24/date=2023-10-24.parquet
+
+    A per-season manifest records every date that was attempted as fetched, empty
+    (off-day) or failed, so updates only request the gaps and never rewrite old
+    partitions. Processes updating different seasons never touch the same file.
+    """
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+        self.manifest = self._load_manifest()
+        self._dirty_seasons = set()
+
+    def _manifest_path(self, season):
+        return os.path.join(self.store_dir, f"season={season}", MANIFEST_FILE)
+
+    def _load_manifest(self):
+        manifest = {}
+        for path in glob.glob(os.path.join(self.store_dir, "season=*", MANIFEST_FILE)):
+            try:
+                with open(path) as f:
+                    manifest.update(json.load(f))
+            except (OSError, ValueError):
+                print(f"Ignoring unreadable game store manifest {path}")
+        return manifest
+
+    def _save_manifest(self):
+        for season in self._dirty_seasons:
+            entries = {key: entry for key, entry in self.manifest.items() if entry['season'] == season}
+            write_json(self._manifest_path(season), entries, indent=1, sort_keys=True)
+        self._dirty_seasons.clear()
+
+    def partition_path(self, date):
+        date = pd.Timestamp(date)
+        return os.path.join(
+            self.store_dir,
+            f"season={season_for_date(date)}",
+            f"date={date.strftime('%Y-%m-%d')}.parquet",
+        )
+
+    def status(self, date):
+        entry = self.manifest.get(pd.Timestamp(date).strftime('%Y-%m-%d'))
+        return entry['status'] if entry else None
+
+    def missing_dates(self, dates, retry_failed=True):
+        """Dates with no final answer in the manifest (failed ones included when retry_failed)"""
+        done = (FETCHED, EMPTY) if retry_failed else (FETCHED, EMPTY, FAILED)
+        return [date for date in pd.DatetimeIndex(dates) if self.status(date) not in done]
+
+    def record(self, date, df):
+        """
+        Store one date's result: a DataFrame (possibly empty) or None for a failed fetch.
+        A date with games still in progress is recorded as failed, so the next update fetches it again.
+        """
+        date = pd.Timestamp(date)
+        key = date.strftime('%Y-%m-%d')
+        if df is None or _in_progress(df):
+            status, rows = FAILED, 0
+        elif df.empty:
+            status, rows = EMPTY, 0
+        else:
+            atomic_write(self.partition_path(date), lambda tmp: df.to_parquet(tmp, index=False))
+            status, rows = FETCHED, len(df)
+        self._dirty_seasons.add(season_for_date(date))
+        self.manifest[key] = {
+            'status': status,
+            'season': season_for_date(date),
+            'rows': rows,
+            'updated_at': time.time(),
+        }
+
+    @span('game_store_update')
+    def update(self, start_date, end_date, max_retries=5, max_workers=1,
+               requests_per_second=DEFAULT_REQUESTS_PER_SECOND):
+        """
+        Fetches exactly the dates in the range that are not yet stored.
+        Today and later are skipped: their scoreboards are not final yet.
+        Returns: manifest status counts for the newly fetched dates
+        """
+        last_final = pd.Timestamp.today().normalize() - pd.Timedelta(days=1)
+        end_date = min(pd.Timestamp(end_date), last_final)
+        gaps = self.missing_dates(pd.date_range(start_date, end_date))
+        if not gaps:
+            print(f"Game store up to date for {pd.Timestamp(start_date).date()} - {end_date.date()}")
+            return {}
+
+        print(f"Fetching {len(gaps)} missing dates into the game store")
+        results = fetch_dates(gaps, max_retries=max_retries, max_workers=max_workers,
+                              requests_per_second=requests_per_second)
+
+        counts = {}
+        for date, df in zip(gaps, results):
+            self.record(date, df)
+            status = self.status(date)
+            counts[status] = counts.get(status, 0) + 1
+        self._save_manifest()
+        print(f"Game store update: {counts}")
+        return counts
+
+    def stored_dates(self, start_date=None, end_date=None, season=None):
+        dates = []
+        for key, entry in self.manifest.items():
+            if entry['status'] != FETCHED:
+                continue
+            if season is not None and entry['season'] != season:
+                continue
+            date = pd.Timestamp(key)
+            if start_date is not None and date < pd.Timestamp(start_date):
+                continue
+            if end_date is not None and date > pd.Timestamp(end_date):
+                continue
+            dates.append(date)
+        return sorted(dates)
+
+    def load(self, start_date=None, end_date=None, season=None):
+        """Concatenated scoreboard rows for the stored dates in range, in date order"""
+        paths = [self.partition_path(date) for date in self.stored_dates(start_date, end_date, season)]
+        if not paths:
+            return pd.DataFrame()
+        return pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+
+
+def _in_progress(df):
+    return 'GAME_STATUS_ID' in df.columns and (df['GAME_STATUS_ID'] == IN_PROGRESS_GAME_STATUS).any()
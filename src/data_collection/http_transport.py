@@ -0,0 +1,112 @@
+import os
+import threading
+
+STATS_BASE_URL = "https://stats.nba.com/stats/{endpoint}"
+# Point the collectors at a local stand-in (see src/serving/stats_stand_in.py)
+BASE_URL_ENV = 'NBA_STATS_BASE_URL'
+
+DEFAULT_POOL_SIZE = 16
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 30
+
+STATS_HEADERS = {
+    'Accept': 'application/json, text/plain, */*',
+    'Accept-Encoding': 'gzip, deflate',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Referer': 'https://www.nba.com/',
+    'Origin': 'https://www.nba.com',
+    'Connection': 'keep-alive',
+}
+
+_config = {
+    'pool_size': DEFAULT_POOL_SIZE,
+    'connect_timeout': DEFAULT_CONNECT_TIMEOUT,
+    'read_timeout': DEFAULT_READ_TIMEOUT,
+    'proxy': None,
+    'base_url': os.environ.get(BASE_URL_ENV) or STATS_BASE_URL,
+}
+_session = None
+_lock = threading.Lock()
+
+
+def configure_transport(pool_size=None, connect_timeout=None, read_timeout=None, proxy=None, base_url=None):
+    """
+    Updates the shared transport settings. The pooled session is rebuilt on next use.
+    base_url is a format string with an {endpoint} field, like STATS_BASE_URL.
+    """
+    global _session
+    with _lock:
+        if pool_size is not None:
+            _config['pool_size'] = pool_size
+        if connect_timeout is not None:
+            _config['connect_timeout'] = connect_timeout
+        if read_timeout is not None:
+            _config['read_timeout'] = read_timeout
+        if proxy is not None:
+            _config['proxy'] = proxy or None
+        if base_url is not None:
+            _config['base_url'] = base_url or STATS_BASE_URL
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def _build_session():
+    # requests is only imported once something actually goes over the network
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    # Retries are handled by the collectors, so the adapter itself never retries
+    adapter = HTTPAdapter(
+        pool_connections=_config['pool_size'],
+        pool_maxsize=_config['pool_size'],
+        max_retries=0,
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(STATS_HEADERS)
+    if _config['proxy']:
+        session.proxies.update({'http': _config['proxy'], 'https': _config['proxy']})
+    _install_nba_api_session(session)
+    return session
+
+
+def _install_nba_api_session(session):
+    """Route nba_api endpoint requests through the shared session (nba_api >= 1.7)."""
+    from nba_api.library.http import NBAHTTP
+    from nba_api.stats.library.http import NBAStatsHTTP
+
+    NBAStatsHTTP.base_url = _config['base_url']
+
+    if hasattr(NBAHTTP, 'set_session'):
+        NBAHTTP.set_session(session)
+    else:
+        print("Installed nba_api has no session hook; endpoint calls will not share the connection pool")
+
+
+def get_session():
+    """Returns the process-wide pooled keep-alive session, creating it on first use."""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+
+def get_timeout():
+    """(connect, read) timeout tuple understood by requests."""
+    return _config['connect_timeout'], _config['read_timeout']
+
+
+def get_endpoint_kwargs():
+    """
+    Keyword arguments to pass through to nba_api endpoint constructors.
+    nba_api hands timeout to session.get as is, so it takes the (connect, read) tuple.
+    """
+    get_session()
+    kwargs = {'timeout': get_timeout()}
+    if _config['proxy']:
+        kwargs['proxy'] = _config['proxy']
+    return kwargs
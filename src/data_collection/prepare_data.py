@@ -1,48 +1,155 @@
+import numpy as np
 import pandas as pd
+from pandas.api.extensions import take
 
+from src.data_collection.schema import COMBINED_SCHEMA, apply_schema
+from src.instrumentation import span
+
+# Game-level columns that get a _team_game suffix once the team's season stats are joined
+TEAM_GAME_RENAMES = {
+    'TEAM_NAME': 'TEAM_NAME_team_game',
+    'FG_PCT': 'FG_PCT_team_game',
+    'FG3_PCT': 'FG3_PCT_team_game',
+    'FT_PCT': 'FT_PCT_team_game',
+    'REB': 'REB_team_game',
+    'AST': 'AST_team_game',
+    'TOV': 'TOV_team_game',
+    'STL': 'STL_team_game',
+    'BLK': 'BLK_team_game',
+    'PTS': 'PTS_team_game'
+}
+
+
+class TeamStatsMatrix:
+    """
+    team_stats_df indexed by TEAM_ID, or by (SEASON, TEAM_ID) when it has a SEASON
+    column, so team and opponent stats are gathered with positional takes.
+    """
+
+    def __init__(self, team_stats_df):
+        self.key_columns = ['SEASON', 'TEAM_ID'] if 'SEASON' in team_stats_df.columns else ['TEAM_ID']
+        if len(self.key_columns) == 2:
+            self.index = pd.MultiIndex.from_frame(team_stats_df[self.key_columns])
+        else:
+            self.index = pd.Index(team_stats_df['TEAM_ID'])
+        if not self.index.is_unique:
+            raise ValueError(f"team_stats_df has duplicate {self.key_columns} rows")
+        # Column order matches what a merge would append: everything but the season key
+        self.columns = [c for c in team_stats_df.columns if c != 'SEASON']
+        # Integer columns as nullable arrays, so a missing team fills with NA without a float detour
+        self.arrays = {c: _fillable(team_stats_df[c]) for c in self.columns}
+
+    def positions(self, team_ids, seasons=None):
+        """Row positions for the given teams; -1 where a team has no stats"""
+        if len(self.key_columns) == 2:
+            return self.index.get_indexer(pd.MultiIndex.from_arrays([seasons, team_ids]))
+        return self.index.get_indexer(team_ids)
+
+    def take(self, column, positions):
+        return take(self.arrays[column], positions, allow_fill=True)
+
+
+def lookup_positions(keys, targets):
+    """Position of each target in keys (-1 when absent), via one sort and a binary search"""
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    idx = np.searchsorted(sorted_keys, targets)
+    idx[idx == len(sorted_keys)] = 0
+    found = sorted_keys[idx] == targets if len(sorted_keys) else np.zeros(len(targets), dtype=bool)
+    return np.where(found, order[idx] if len(sorted_keys) else -1, -1)
+
+
+def _fillable(series):
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return pd.array(series.to_numpy(), dtype=series.dtype.name.capitalize())
+    # take() wants NumPy columns as ndarrays, not the NumpyExtensionArray series.array wraps them in
+    return series.array if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) else series.to_numpy()
+
+
+def _game_team_key(df):
+    # Integer GAME_IDs are < 2**33 and TEAM_IDs < 2**31, so the pair packs into one int64
+    return df['GAME_ID'].to_numpy(dtype=np.int64) * (1 << 31) + df['TEAM_ID'].to_numpy(dtype=np.int64)
+
+
+@span('prepare_full_df')
 def prepare_full_df(game_data_df, team_stats_df, opponents_df):
-    # Merge game data with opponents to identify opponent team IDs
+    """
+    Game rows with the team's season stats (_team_season) and the opponent's
+    season stats (unsuffixed), named exactly as the former merge-based version:
+    game columns overlapping the team stats get _team_game, and the game row's
+    TEAM_ID becomes TEAM_ID_opponent_game next to the opponent's TEAM_ID_opponent_season.
+    """
+    team_stats = team_stats_df if isinstance(team_stats_df, TeamStatsMatrix) else TeamStatsMatrix(team_stats_df)
+    seasons = game_data_df['SEASON'].to_numpy() if len(team_stats.key_columns) == 2 else None
+
+    # Opponent per game row, looked up on (GAME_ID, TEAM_ID)
+    opponent_pos = lookup_positions(
+        _game_team_key(opponents_df), _game_team_key(game_data_df)
+    )
+    opponent_ids = take(_fillable(opponents_df['OPPONENT_TEAM_ID']), opponent_pos, allow_fill=True)
+
+    team_pos = team_stats.positions(game_data_df['TEAM_ID'].to_numpy(), seasons)
+    opponent_stats_pos = team_stats.positions(opponent_ids, seasons)
+
+    # Frame the opponent's stats are joined onto: game columns (overlaps with the
+    # team stats suffixed _team_game), OPPONENT_TEAM_ID, then the team's season stats
+    left = []
+    for column in game_data_df.columns:
+        if column in team_stats.key_columns:
+            name = column
+        elif column in team_stats.columns:
+            name = f"{column}_team_game"
+        else:
+            name = TEAM_GAME_RENAMES.get(column, column)
+        left.append((name, game_data_df[column].array))
+    left.append(('OPPONENT_TEAM_ID', opponent_ids))
+    for column in team_stats.columns:
+        if column == 'TEAM_ID':
+            continue
+        name = f"{column}_team_season" if column in game_data_df.columns else column
+        left.append((TEAM_GAME_RENAMES.get(name, name), team_stats.take(column, team_pos)))
+
+    # Opponent's season stats; clashing names become _opponent_game / _opponent_season
+    left_names = {name for name, _ in left}
+    columns = {}
+    for name, values in left:
+        columns[f"{name}_opponent_game" if name in team_stats.columns else name] = values
+    for column in team_stats.columns:
+        name = f"{column}_opponent_season" if column in left_names else column
+        columns[name] = team_stats.take(column, opponent_stats_pos)
+
+    return apply_schema(pd.DataFrame(columns, copy=False), COMBINED_SCHEMA)
+
+@span('prepare_point_in_time_df')
+def prepare_point_in_time_df(game_data_df, opponents_df, features_df):
+    """
+    Game rows with the team's and the opponent's pre-game rolling features
+    (suffixed _team and _opponent) instead of whole-season aggregates.
+    features_df comes from RollingTeamStats: one row per GAME_ID and TEAM_ID.
+    """
     game_with_opponents = pd.merge(
-        game_data_df, opponents_df,
+        game_data_df[['GAME_ID', 'TEAM_ID', 'GAME_DATE', 'WL', 'IS_HOME']
+                     if 'IS_HOME' in game_data_df.columns
+                     else ['GAME_ID', 'TEAM_ID', 'GAME_DATE', 'WL']],
+        opponents_df,
         on=['GAME_ID', 'TEAM_ID'],
         how='left'
     )
 
-    # Merge with team stats for the team's own season stats
-    game_with_team_stats = pd.merge(
+    feature_cols = [c for c in features_df.columns if c not in ('GAME_ID', 'TEAM_ID', 'GAME_DATE')]
+    team_features = features_df[['GAME_ID', 'TEAM_ID'] + feature_cols]
+
+    game_with_team = pd.merge(
         game_with_opponents,
-        team_stats_df,
-        left_on='TEAM_ID',
-        right_on='TEAM_ID',
-        suffixes=('_team_game', '_team_season'),  # Explicit suffixes
+        team_features.rename(columns={c: f"{c}_team" for c in feature_cols}),
+        on=['GAME_ID', 'TEAM_ID'],
         how='left'
     )
 
-    # Rename columns to avoid conflicts during the next merge
-    columns_to_rename = {
-        'TEAM_NAME': 'TEAM_NAME_team_game',
-        'FG_PCT': 'FG_PCT_team_game',
-        'FG3_PCT': 'FG3_PCT_team_game',
-        'FT_PCT': 'FT_PCT_team_game',
-        'REB': 'REB_team_game',
-        'AST': 'AST_team_game',
-        'TOV': 'TOV_team_game',
-        'STL': 'STL_team_game',
-        'BLK': 'BLK_team_game',
-        'PTS': 'PTS_team_game'
-    }
-    game_with_team_stats.rename(columns=columns_to_rename, inplace=True)
-
-    # Merge with team stats again for the opponent's season stats
     game_with_full_stats = pd.merge(
-        game_with_team_stats,
-        team_stats_df,
-        left_on='OPPONENT_TEAM_ID',
-        right_on='TEAM_ID',
-        suffixes=('_opponent_game', '_opponent_season'),  # Explicit suffixes
+        game_with_team,
+        team_features.rename(columns={'TEAM_ID': 'OPPONENT_TEAM_ID', **{c: f"{c}_opponent" for c in feature_cols}}),
+        on=['GAME_ID', 'OPPONENT_TEAM_ID'],
         how='left'
     )
-
-    # Print columns for debugging
-    print("Columns after opponent merge:", game_with_full_stats.columns.tolist())
-    return game_with_full_stats
+    return apply_schema(game_with_full_stats, COMBINED_SCHEMA)
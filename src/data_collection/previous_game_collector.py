@@ -1,62 +1,99 @@
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 import pandas as pd
 
 from src.data_collection.future_game_collector import fetch_games_for_date
+from src.data_collection.rate_limiter import make_rate_limiter
+from src.data_collection.response_store import ReplayMissError
+from src.data_collection.schema import OPPONENTS_SCHEMA, apply_schema
+from src.instrumentation import count, span
 
+# stats.nba.com starts throttling well before this; shared across all workers
+DEFAULT_REQUESTS_PER_SECOND = 2.0
+# Dates fetched at once; the shared rate limit, not this, bounds the request rate
+DEFAULT_FETCH_WORKERS = 4
 
+
+@span('identify_opponents')
 def identify_opponents(game_log):
+    """
+    Maps every team in a two-team game to its opponent.
+    After sorting by GAME_ID each valid game is two adjacent rows, so the pairs
+    are read straight off the even and odd positions.
+    Returns: DataFrame with GAME_ID, TEAM_ID, OPPONENT_TEAM_ID (two rows per game)
+    """
     game_log = game_log.sort_values(by='GAME_ID')
 
-    opponent_mappings = []
+    team_count = game_log.groupby('GAME_ID')['GAME_ID'].transform('size')
+    paired = game_log[(team_count == 2).to_numpy()]
 
-    # For each game, find the two teams and assign them as each other's opponent
-    for game_id, group in game_log.groupby('GAME_ID'):
-        if len(group) == 2:
-            team_ids = group['TEAM_ID'].values
-            opponent_mappings.append({'GAME_ID': game_id, 'TEAM_ID': team_ids[0], 'OPPONENT_TEAM_ID': team_ids[1]})
-            opponent_mappings.append({'GAME_ID': game_id, 'TEAM_ID': team_ids[1], 'OPPONENT_TEAM_ID': team_ids[0]})
+    game_ids = paired['GAME_ID'].to_numpy()[0::2]
+    team_ids = paired['TEAM_ID'].to_numpy()
+    first, second = team_ids[0::2], team_ids[1::2]
 
-    opponents_df = pd.DataFrame(opponent_mappings)
+    opponents_df = pd.DataFrame({
+        'GAME_ID': np.repeat(game_ids, 2),
+        'TEAM_ID': np.column_stack([first, second]).ravel(),
+        'OPPONENT_TEAM_ID': np.column_stack([second, first]).ravel(),
+    })
 
-    return opponents_df
+    return apply_schema(opponents_df, OPPONENTS_SCHEMA)
 
 
-def fetch_and_process_games(start_date="2023-10-18", end_date="2024-04-10", max_retries=5):
+@span('fetch_scoreboard')
+def fetch_date_with_retries(date, max_retries=5, rate_limiter=None):
+    """
+    Fetches a single date with exponential backoff between attempts
+    Returns: DataFrame for the date (empty on off-days) or None on permanent failure
     """
-    Fetches and processes historical game data from NBA API
-    Returns: DataFrame with processed game data
+    retries = 0
+    date_str = date.strftime('%Y-%m-%d')
+
+    while retries < max_retries:
+        try:
+            # Only requests that miss the response store count against the rate limit
+            df = fetch_games_for_date(date, raise_errors=True, rate_limiter=rate_limiter)
+            count('scoreboard_dates', result='games' if len(df) else 'off_day')
+            return df
+
+        except ReplayMissError as e:
+            # Nothing recorded for this date; retrying offline cannot help
+            print(f"Error fetching {date_str}: {str(e)}")
+            count('scoreboard_dates', result='replay_miss')
+            return None
+
+        except Exception as e:
+            print(f"Error fetching {date_str}: {str(e)}")
+            retries += 1
+            if retries >= max_retries:
+                break
+
+            sleep_time = min(2 ** retries, 60)  # Cap at 60 seconds
+            print(f"Retrying in {sleep_time} seconds...")
+            count('fetch_retries', endpoint='scoreboardV2')
+            count('backoff_seconds', sleep_time, endpoint='scoreboardV2')
+            time.sleep(sleep_time)
+
+    print(f"Permanent failure for {date_str}, skipping...")
+    count('scoreboard_dates', result='failed')
+    return None
+
+
+def fetch_dates(dates, max_retries=5, max_workers=1, requests_per_second=DEFAULT_REQUESTS_PER_SECOND):
     """
-    all_dates = pd.date_range(start_date, end_date)
-    scoreboard_dfs = []
-
-    for date in all_dates:
-        retries = 0
-        success = False
-        date_str = date.strftime('%Y-%m-%d')
-
-        while retries < max_retries and not success:
-            try:
-                print(f"Fetching games for {date_str} (attempt {retries + 1})")
-                df = fetch_games_for_date(date)
-                print("Scoreboard columns:", df.columns.tolist())
-
-                if not df.empty:
-                    scoreboard_dfs.append(df)
-                    success = True
-                else:
-                    print(f"No games found for {date_str}")
-                    success = True
-
-            except Exception as e:
-                print(f"Error fetching {date_str}: {str(e)}")
-                if retries >= max_retries:
-                    print(f"Permanent failure for {date_str}, skipping...")
-                    break
-
-                retries += 1
-                sleep_time = min(2 ** retries, 60)  # Cap at 60 seconds
-                print(f"Retrying in {sleep_time} seconds...")
-                time.sleep(sleep_time)
-
-    return pd.concat(scoreboard_dfs, ignore_index=True) if scoreboard_dfs else pd.DataFrame()
+    Fetches each date with retries, concurrently when max_workers > 1
+    Returns: list aligned with dates of DataFrame (empty on off-days) or None on failure
+    """
+    rate_limiter = make_rate_limiter(requests_per_second)
+
+    def fetch(date):
+        return fetch_date_with_retries(date, max_retries=max_retries, rate_limiter=rate_limiter)
+
+    if max_workers <= 1:
+        return [fetch(date) for date in dates]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # map yields results in submission order, i.e. date order
+        return list(executor.map(fetch, dates))
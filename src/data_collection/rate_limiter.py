@@ -0,0 +1,53 @@
+import threading
+import time
+
+# Share of the API request budget this process may use; set_process_share(1 / n)
+# in each of n worker processes keeps their combined rate under the limit
+_process_share = 1.0
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by concurrent collectors.
+    Each request takes one token; tokens refill at `rate` per second up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available, then consume them."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def set_process_share(share):
+    """Scale every rate limiter created in this process from now on by share (0 < share <= 1)"""
+    global _process_share
+    if not 0 < share <= 1:
+        raise ValueError(f"share must be in (0, 1], got {share}")
+    _process_share = float(share)
+
+
+def make_rate_limiter(requests_per_second):
+    """TokenBucket for this process's share of requests_per_second, or None when unlimited"""
+    if not requests_per_second:
+        return None
+    return TokenBucket(requests_per_second * _process_share)
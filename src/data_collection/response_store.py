@@ -0,0 +1,135 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+
+from src.data_collection.result_sets import dumps, loads, request_payload
+from src.file_io import atomic_write
+from src.instrumentation import count
+
+STORE_DIR = os.path.join("cache", "responses")
+
+# record: read from the store first, fetch and save on a miss (default)
+# replay: strictly offline, a miss raises ReplayMissError
+# off:    always fetch, never read or write the store
+MODES = ('record', 'replay', 'off')
+
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode when a response was never recorded."""
+
+
+def normalize_params(params):
+    """Params as sorted (key, str(value)) pairs so 0 and '0' address the same response"""
+    return sorted((str(k), '' if v is None else str(v)) for k, v in params.items())
+
+
+def response_key(endpoint, params):
+    payload = json.dumps([endpoint.lower(), normalize_params(params)], separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseStore:
+    """
+    Content-addressed store of raw stats API payloads, gzip-compressed JSON
+    keyed by endpoint plus normalized request parameters.
+    """
+
+    def __init__(self, store_dir=STORE_DIR, mode=None):
+        mode = mode or os.environ.get('NBA_RESPONSE_STORE', 'record')
+        if mode not in MODES:
+            raise ValueError(f"Unknown response store mode {mode!r}, expected one of {MODES}")
+        self.store_dir = store_dir
+        self.mode = mode
+
+    def path_for(self, endpoint, params):
+        key = response_key(endpoint, params)
+        return os.path.join(self.store_dir, endpoint.lower(), key[:2], f"{key}.json.gz")
+
+    def get(self, endpoint, params):
+        path = self.path_for(endpoint, params)
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, 'rb') as f:
+            return loads(f.read())
+
+    def put(self, endpoint, params, payload):
+        def writer(tmp_path):
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(dumps(payload))
+
+        atomic_write(self.path_for(endpoint, params), writer)
+
+    def age(self, endpoint, params):
+        """Seconds since the stored payload was written, or None when there is none"""
+        path = self.path_for(endpoint, params)
+        if not os.path.exists(path):
+            return None
+        return time.time() - os.path.getmtime(path)
+
+    def fetch(self, endpoint, params, fetcher, ttl=None, final=None):
+        """
+        Returns the stored payload for (endpoint, params), calling fetcher() on a miss.
+        fetcher must return the decoded JSON payload and raise on failure, so that
+        errors are never recorded.
+
+        Payloads that can still change need a freshness rule in record mode: a
+        stored one older than ttl seconds is fetched again, and ttl=0 bypasses
+        the store entirely. final(payload), when given, says whether a payload
+        can no longer change; only final payloads are recorded or reused.
+        Replay mode serves whatever was recorded.
+        """
+        if self.mode == 'replay' or (self.mode == 'record' and ttl != 0):
+            payload = self.get(endpoint, params)
+            if payload is not None and self.mode == 'record':
+                age = self.age(endpoint, params)
+                if ttl is not None and (age is None or age >= ttl):
+                    payload = None
+                    count('cache_misses', cache='response_store', reason='expired')
+                elif final is not None and not final(payload):
+                    payload = None
+                    count('cache_misses', cache='response_store', reason='not_final')
+            if payload is not None:
+                count('cache_hits', cache='response_store', tier='disk')
+                return payload
+            count('cache_misses', cache='response_store')
+            if self.mode == 'replay':
+                raise ReplayMissError(f"No recorded response for {endpoint} {normalize_params(params)}")
+
+        payload = fetcher()
+        if self.mode == 'record' and ttl != 0 and (final is None or final(payload)):
+            self.put(endpoint, params, payload)
+        return payload
+
+
+_store = None
+
+
+def get_response_store():
+    global _store
+    if _store is None:
+        _store = ResponseStore()
+    return _store
+
+
+def configure_response_store(store_dir=STORE_DIR, mode=None):
+    global _store
+    _store = ResponseStore(store_dir=store_dir, mode=mode)
+    return _store
+
+
+def fetch_endpoint(endpoint_cls, ttl=None, **kwargs):
+    """
+    Raw payload for an nba_api endpoint, served from the response store when recorded.
+    kwargs are passed to the endpoint constructor; the request is only sent on a miss,
+    and its body is decoded once (the endpoint's own parsing is skipped).
+    ttl is passed to ResponseStore.fetch for data that can still change.
+    """
+    endpoint = endpoint_cls(get_request=False, **kwargs)
+
+    def fetcher():
+        count('api_calls', endpoint=endpoint_cls.endpoint)
+        return request_payload(endpoint)
+
+    return get_response_store().fetch(endpoint_cls.endpoint, endpoint.parameters, fetcher, ttl=ttl)
@@ -0,0 +1,109 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# 'orjson' (default when installed) or 'json'
+JSON_BACKEND_ENV = 'NBA_JSON_BACKEND'
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_NONE = type(None)
+
+
+def json_backend():
+    if orjson is not None and os.environ.get(JSON_BACKEND_ENV, 'orjson') == 'orjson':
+        return 'orjson'
+    return 'json'
+
+
+def loads(data):
+    """Decodes a JSON document from str or bytes"""
+    if json_backend() == 'orjson':
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(payload):
+    """Compact JSON encoding of payload as UTF-8 bytes"""
+    if json_backend() == 'orjson':
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def find_result_set(payload, name):
+    """
+    A result set of a stats API payload by name (or position), or None.
+    Single-set endpoints send 'resultSet' instead of a 'resultSets' list.
+    """
+    result_sets = payload.get('resultSets', payload.get('resultSet', []))
+    if isinstance(result_sets, dict):
+        result_sets = [result_sets]
+    if isinstance(name, int):
+        return result_sets[name] if -len(result_sets) <= name < len(result_sets) else None
+    return next((rs for rs in result_sets if rs.get('name') == name), None)
+
+
+def typed_column(values):
+    """
+    One column of row values as an array, typed the way a DataFrame built from
+    the rows would be: int64, float64 (None as NaN), bool, or object.
+    """
+    kinds = set(map(type, values))
+    if kinds == {bool}:
+        return np.array(values, dtype=bool)
+    if kinds <= {int, float, _NONE} and kinds - {_NONE}:
+        if kinds == {int}:
+            return np.array(values, dtype=np.int64)
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def decode_columns(result_set, columns=None):
+    """
+    {header: array} for a result set, transposing the row lists in a single
+    pass. columns optionally limits (and orders) the headers decoded.
+    """
+    headers = result_set['headers']
+    rows = result_set['rowSet']
+    wanted = headers if columns is None else columns
+    if not rows:
+        return {header: np.array([], dtype=object) for header in wanted}
+
+    by_header = dict(zip(headers, zip(*rows)))
+    return {header: typed_column(by_header[header]) for header in wanted}
+
+
+def result_set_frame(payload, name, columns=None):
+    """A result set as a DataFrame built from its decoded columns; empty when it is missing"""
+    result_set = find_result_set(payload, name)
+    if result_set is None:
+        return pd.DataFrame(columns=columns or [])
+    return pd.DataFrame(decode_columns(result_set, columns), copy=False)
+
+
+def request_payload(endpoint):
+    """
+    Sends an nba_api endpoint built with get_request=False and decodes the body
+    once, skipping the endpoint's own parse of the response.
+    """
+    from nba_api.stats.library.http import NBAStatsHTTP
+
+    response = NBAStatsHTTP().send_api_request(
+        endpoint=endpoint.endpoint,
+        parameters=endpoint.parameters,
+        proxy=getattr(endpoint, 'proxy', None),
+        headers=getattr(endpoint, 'headers', None),
+        timeout=getattr(endpoint, 'timeout', None),
+    )
+    payload = loads(response.get_response())
+    # Error bodies must raise rather than reach the response store
+    if not isinstance(payload, dict) or ('resultSets' not in payload and 'resultSet' not in payload):
+        raise RuntimeError(f"Unexpected {endpoint.endpoint} response from {response.get_url()}")
+    return payload
@@ -0,0 +1,222 @@
+import os
+import pickle
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from src.data_collection.future_game_collector import create_game_data_df
+from src.data_collection.game_store import HistoricalGameStore
+from src.data_collection.schema import COMBINED_SCHEMA, apply_schema
+from src.data_collection.seasons import season_date_range, season_for_date
+from src.file_io import atomic_write
+from src.instrumentation import span
+
+ROLLING_STATS = ['FG_PCT', 'FG3_PCT', 'FT_PCT', 'REB', 'AST', 'TOV', 'PTS']
+DEFAULT_WINDOW = 10
+STATE_FILE = os.path.join("cache", "rolling_team_stats.pkl")
+
+
+def rolling_state_file(season):
+    """Per-season engine state, so seasons can be built in parallel processes"""
+    return os.path.join("cache", f"rolling_team_stats_{season}.pkl")
+
+
+class RollingTeamStats:
+    """
+    Point-in-time team features kept as running per-team sums.
+
+    For each (season, team) the engine holds season-to-date sums and counts plus
+    the last `window` game lines. update() walks new game dates in order and, for
+    every game, emits the features as they stood before tip-off, then folds that
+    day's results into the state. Adding a day therefore costs O(games that day).
+    source_hash and source_rows fingerprint every game row folded in so far, so
+    a saved engine can tell whether it was built from a given season's games.
+    """
+
+    # Engines pickled before the fingerprint existed never match one
+    source_hash = None
+    source_rows = None
+
+    def __init__(self, window=DEFAULT_WINDOW, stats=ROLLING_STATS):
+        self.window = window
+        self.stats = list(stats)
+        self.last_date = None
+        self._sums = {}
+        self._counts = {}
+        self._games = {}
+        self._recent = {}
+        self._history = []
+        self.source_hash = 0
+        self.source_rows = 0
+
+    def feature_columns(self):
+        return (['GAMES_PLAYED']
+                + [f"{stat}_season_avg" for stat in self.stats]
+                + [f"{stat}_last{self.window}" for stat in self.stats])
+
+    def _features(self, season, team_id):
+        key = (season, team_id)
+        games = self._games.get(key, 0)
+        if games == 0:
+            nan = np.full(len(self.stats), np.nan)
+            return [0] + list(nan) + list(nan)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            season_avg = self._sums[key] / self._counts[key]
+        recent = np.nanmean(np.vstack(self._recent[key]), axis=0) if self._recent[key] else season_avg
+        return [games] + list(season_avg) + list(recent)
+
+    def _apply(self, season, team_id, values):
+        key = (season, team_id)
+        if key not in self._games:
+            self._sums[key] = np.zeros(len(self.stats))
+            self._counts[key] = np.zeros(len(self.stats))
+            self._games[key] = 0
+            self._recent[key] = deque(maxlen=self.window)
+
+        present = ~np.isnan(values)
+        self._sums[key] += np.where(present, values, 0.0)
+        self._counts[key] += present
+        self._games[key] += 1
+        self._recent[key].append(values)
+
+    @span('rolling_update')
+    def update(self, game_data_df):
+        """
+        Folds in games dated after last_date (earlier rows were already applied,
+        so dates must arrive in order).
+        Returns: pre-game features for the new rows, keyed by GAME_ID and TEAM_ID
+        """
+        games = game_data_df.copy()
+        games['GAME_DATE'] = pd.to_datetime(games['GAME_DATE'])
+        if self.last_date is not None:
+            games = games[games['GAME_DATE'] > self.last_date]
+        # Scheduled but unplayed games have no result to learn from yet
+        games = games[games['PTS'].notna()]
+        if games.empty:
+            return pd.DataFrame(columns=['GAME_ID', 'TEAM_ID', 'GAME_DATE'] + self.feature_columns())
+
+        for column in self.stats:
+            if column not in games.columns:
+                games[column] = np.nan
+        values = games[self.stats].to_numpy(dtype=float)
+        if self.source_rows is not None:
+            self.source_hash = (self.source_hash + self._row_hash_sum(games, values)) % 2**64
+            self.source_rows += len(games)
+
+        rows = []
+        for game_date, day_index in games.groupby('GAME_DATE').indices.items():
+            season = season_for_date(game_date)
+            day = games.iloc[day_index]
+            team_ids = day['TEAM_ID'].to_numpy()
+
+            # Features first, so a game never sees its own result
+            for game_id, team_id in zip(day['GAME_ID'].to_numpy(), team_ids):
+                rows.append([game_id, team_id, game_date] + self._features(season, team_id))
+            for team_id, row_values in zip(team_ids, values[day_index]):
+                self._apply(season, team_id, row_values)
+            self.last_date = game_date
+
+        features = pd.DataFrame(rows, columns=['GAME_ID', 'TEAM_ID', 'GAME_DATE'] + self.feature_columns())
+        apply_schema(features, COMBINED_SCHEMA)
+        self._history.append(features)
+        return features
+
+    def _row_hash_sum(self, games, values):
+        """Order-independent hash of game rows: the wrapping uint64 sum of their row hashes"""
+        rows = pd.DataFrame({
+            'GAME_ID': pd.to_numeric(games['GAME_ID']).to_numpy(dtype=np.int64),
+            'TEAM_ID': games['TEAM_ID'].to_numpy(dtype=np.int64),
+            'GAME_DATE': pd.to_datetime(games['GAME_DATE']).to_numpy(),
+        })
+        for i, column in enumerate(self.stats):
+            rows[column] = values[:, i]
+        return int(pd.util.hash_pandas_object(rows, index=False).to_numpy().sum(dtype=np.uint64))
+
+    def built_from(self, game_data_df):
+        """
+        Whether the engine's state is exactly game_data_df's played games up to
+        last_date, so update(game_data_df) only has to fold in the later days.
+        """
+        if self.last_date is None or self.source_rows is None:
+            return False
+        games = game_data_df[(pd.to_datetime(game_data_df['GAME_DATE']) <= self.last_date)
+                             & game_data_df['PTS'].notna()]
+        if len(games) != self.source_rows:
+            return False
+        values = games.reindex(columns=self.stats).to_numpy(dtype=float)
+        return self._row_hash_sum(games, values) == self.source_hash
+
+    def features_as_of(self, team_ids, date):
+        """
+        Features for team_ids going into games on date, from everything played before it.
+        """
+        date = pd.Timestamp(date).normalize()
+        if self.last_date is not None and date <= self.last_date:
+            raise ValueError(
+                f"Engine state already includes games on {self.last_date.date()}; "
+                f"use training_features() for dates up to then"
+            )
+        season = season_for_date(date)
+        rows = [[team_id] + self._features(season, team_id) for team_id in team_ids]
+        return apply_schema(pd.DataFrame(rows, columns=['TEAM_ID'] + self.feature_columns()), COMBINED_SCHEMA)
+
+    def features_for_games(self, game_data_df, date):
+        """as-of-date features keyed by GAME_ID and TEAM_ID for the games scheduled on date"""
+        features = self.features_as_of(game_data_df['TEAM_ID'].unique(), date)
+        games = game_data_df[['GAME_ID', 'TEAM_ID']].assign(GAME_DATE=pd.Timestamp(date).normalize())
+        return games.merge(features, on='TEAM_ID', how='left')
+
+    def catch_up(self, game_store, end_date=None, season=None):
+        """Folds in the stored games (of season, if given) after last_date, up to end_date"""
+        start_date = None if self.last_date is None else self.last_date + pd.Timedelta(days=1)
+        new_games = game_store.load(start_date=start_date, end_date=end_date, season=season)
+        if not new_games.empty:
+            self.update(create_game_data_df(new_games))
+        return self
+
+    def training_features(self):
+        """Pre-game features for every game the engine has processed"""
+        if not self._history:
+            return pd.DataFrame(columns=['GAME_ID', 'TEAM_ID', 'GAME_DATE'] + self.feature_columns())
+        if len(self._history) > 1:
+            self._history = [pd.concat(self._history, ignore_index=True)]
+        return self._history[0]
+
+    def save(self, path=STATE_FILE):
+        def writer(tmp_path):
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(self, f)
+
+        atomic_write(path, writer)
+
+    @classmethod
+    def load(cls, path=STATE_FILE, window=DEFAULT_WINDOW):
+        """Saved engine, or a fresh one when there is no state (or the window changed)"""
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                engine = pickle.load(f)
+            if engine.window == window:
+                return engine
+            print(f"Rolling stats state uses window {engine.window}, rebuilding for {window}")
+        return cls(window=window)
+
+
+def engine_for_date(game_date, window=DEFAULT_WINDOW):
+    """
+    The season's engine brought up to the day before game_date: the game store
+    and the saved state only add the days since the last run.
+    """
+    yesterday = pd.Timestamp(game_date).normalize() - pd.Timedelta(days=1)
+    season = season_for_date(game_date)
+    season_start, _ = season_date_range(season)
+
+    game_store = HistoricalGameStore()
+    game_store.update(season_start, yesterday)
+
+    state_file = rolling_state_file(season)
+    engine = RollingTeamStats.load(state_file, window)
+    engine.catch_up(game_store, end_date=yesterday, season=season)
+    engine.save(state_file)
+    return engine
@@ -0,0 +1,88 @@
+import pandas as pd
+
+# Declared dtypes for each pipeline stage's output. Columns a stage does not
+# declare keep their dtype, except float64 which is narrowed to float32.
+# GAME_IDs are stored as integers; format_game_id restores the API's zero-padded form.
+
+GAME_ID_WIDTH = 10
+
+BOX_SCORE_FLOATS = {
+    column: 'float32'
+    for column in ['FG_PCT', 'FG3_PCT', 'FT_PCT', 'REB', 'AST', 'TOV', 'STL', 'BLK', 'PTS']
+}
+
+GAME_DATA_SCHEMA = {
+    'GAME_ID': 'int64',
+    'TEAM_ID': 'int32',
+    'GAME_DATE': 'datetime64[ns]',
+    'WL': 'category',
+    'IS_HOME': 'bool',
+    **BOX_SCORE_FLOATS,
+}
+
+OPPONENTS_SCHEMA = {
+    'GAME_ID': 'int64',
+    'TEAM_ID': 'int32',
+    'OPPONENT_TEAM_ID': 'int32',
+}
+
+TEAM_STATS_SCHEMA = {
+    'TEAM_ID': 'int32',
+    'TEAM_NAME': 'category',
+    **BOX_SCORE_FLOATS,
+}
+
+COMBINED_SCHEMA = {
+    'GAME_ID': 'int64',
+    'TEAM_ID': 'int32',
+    'GAME_DATE': 'datetime64[ns]',
+    'WL': 'category',
+    'IS_HOME': 'bool',
+    'OPPONENT_TEAM_ID': 'int32',
+    'TEAM_ID_opponent_game': 'int32',
+    'TEAM_ID_opponent_season': 'int32',
+    'TEAM_NAME': 'category',
+    'TEAM_NAME_team_game': 'category',
+}
+
+# Left merges can leave gaps in integer and flag columns
+NULLABLE = {'int32': 'Int32', 'int64': 'Int64', 'bool': 'boolean'}
+
+
+def apply_schema(df, schema):
+    """Casts df in place to the stage schema and returns it"""
+    for column in df.columns:
+        dtype = schema.get(column)
+        if dtype is None:
+            if df[column].dtype == 'float64':
+                df[column] = df[column].astype('float32')
+            continue
+        current = str(df[column].dtype)
+        if current == dtype or (dtype.startswith('datetime64') and current.startswith('datetime64')):
+            continue
+        if dtype in NULLABLE and df[column].isna().any():
+            dtype = NULLABLE[dtype]
+        if column == 'GAME_ID' or dtype in ('int32', 'int64', 'Int32', 'Int64'):
+            df[column] = pd.to_numeric(df[column]).astype(dtype)
+        elif dtype.startswith('datetime64'):
+            df[column] = pd.to_datetime(df[column])
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+def format_game_id(game_ids):
+    """Integer GAME_IDs back to the API's zero-padded strings ('0022300061')"""
+    return pd.Series(game_ids).astype('int64').astype(str).str.zfill(GAME_ID_WIDTH)
+
+
+def write_dataset(df, path):
+    """Writes a stage output as parquet, keeping its dtypes"""
+    df.to_parquet(path, index=False)
+
+
+def read_dataset(path, schema=COMBINED_SCHEMA):
+    """Reads a dataset written by write_dataset (or a legacy CSV) with the stage schema"""
+    if path.endswith('.csv'):
+        return apply_schema(pd.read_csv(path, dtype={'GAME_ID': str}), schema)
+    return pd.read_parquet(path)
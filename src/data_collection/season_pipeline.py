@@ -0,0 +1,122 @@
+import inspect
+from functools import lru_cache
+
+from src.data_collection import prepare_data, rolling_team_stats, schema
+from src.data_collection.future_game_collector import create_game_data_df, derive_wl
+from src.data_collection.game_store import HistoricalGameStore
+from src.data_collection.prepare_data import prepare_full_df, prepare_point_in_time_df
+from src.data_collection.previous_game_collector import DEFAULT_FETCH_WORKERS, identify_opponents
+from src.data_collection.rolling_team_stats import DEFAULT_WINDOW, RollingTeamStats, rolling_state_file
+from src.data_collection.schema import TEAM_STATS_SCHEMA, apply_schema
+from src.data_collection.season_stat_collector import (TEAM_STATS_OFFSET, fetch_team_stats_unscaled,
+                                                       save_team_stats_scaler, scale_team_stats,
+                                                       team_stats_season)
+from src.data_collection.seasons import season_date_range
+from src.pipeline import Pipeline, Stage, digest_of
+
+
+def load_scoreboard(season, fetch_workers=DEFAULT_FETCH_WORKERS):
+    """
+    The season's scoreboard rows; only dates the game store has not seen yet are
+    fetched, fetch_workers at a time
+    """
+    start_date, end_date = season_date_range(season)
+    game_store = HistoricalGameStore()
+    game_store.update(start_date, end_date, max_workers=fetch_workers)
+    historical_raw = game_store.load(start_date, end_date)
+
+    required_columns = ['GAME_ID', 'TEAM_ID']
+    missing = [col for col in required_columns if col not in historical_raw.columns]
+    if missing:
+        raise ValueError(f"Missing critical columns in raw data for {season}: {missing}")
+    return historical_raw
+
+
+def game_data_stage(scoreboard, season):
+    game_data_df = create_game_data_df(scoreboard)
+    if game_data_df.empty:
+        raise ValueError(f"No game data available for processing in {season}")
+    return game_data_df
+
+
+def opponents_stage(game_data):
+    return identify_opponents(game_data)
+
+
+def team_stats_raw_stage(season, offset):
+    return fetch_team_stats_unscaled(team_stats_season(season, offset))
+
+
+def team_stats_stage(team_stats_raw, season, offset):
+    team_stats_df = scale_team_stats(team_stats_raw)
+    # The model bundle keeps the scaler the training features were built with
+    save_team_stats_scaler(team_stats_season(season, offset), team_stats_df.attrs['scaler'])
+    return apply_schema(team_stats_df, TEAM_STATS_SCHEMA)
+
+
+@lru_cache(maxsize=None)
+def rolling_code_version():
+    """A saved engine is only resumed by the code that built it"""
+    return digest_of(inspect.getsource(rolling_team_stats), inspect.getsource(schema))
+
+
+def rolling_features_stage(game_data, season, window):
+    """
+    Resumes from the season's saved engine when it was built by the same code
+    from exactly these games up to its last date, so a daily run folds in only
+    the new days (O(new games)); otherwise the season is replayed from scratch.
+    """
+    code_version = rolling_code_version()
+    state_file = rolling_state_file(season)
+    engine = RollingTeamStats.load(state_file, window)
+    if getattr(engine, 'code_version', None) != code_version or not engine.built_from(game_data):
+        engine = RollingTeamStats(window=window)
+    engine.code_version = code_version
+    engine.update(game_data)
+    # Prediction catches up from this state instead of replaying the season
+    engine.save(state_file)
+    return engine.training_features()
+
+
+def combined_stage(game_data, team_stats, opponents):
+    return prepare_full_df(game_data, team_stats, opponents)
+
+
+def point_in_time_stage(game_data, opponents, rolling_features):
+    return prepare_point_in_time_df(game_data, opponents, rolling_features)
+
+
+def season_pipeline(season, feature_mode='season', window=DEFAULT_WINDOW, fetch_workers=DEFAULT_FETCH_WORKERS,
+                    **kwargs):
+    """
+    Stages building one season's combined feature rows ('combined'). A change
+    to the merge only re-runs the merge; the scoreboard and team stats come from
+    the stage cache until they expire. The merges hash all of prepare_data and
+    schema: re-running them is cheap, reusing a wrong output is not.
+    fetch_workers is how many missing scoreboard dates are fetched at once.
+    """
+    stages = [
+        Stage('scoreboard', load_scoreboard, params={'season': season}, code=(HistoricalGameStore,),
+              options={'fetch_workers': fetch_workers}),
+        Stage('game_data', game_data_stage, inputs=('scoreboard',), params={'season': season},
+              code=(create_game_data_df, derive_wl, schema)),
+        Stage('opponents', opponents_stage, inputs=('game_data',), code=(identify_opponents, schema)),
+    ]
+    if feature_mode == 'rolling':
+        stages += [
+            Stage('rolling_features', rolling_features_stage, inputs=('game_data',),
+                  params={'season': season, 'window': window}, code=(rolling_team_stats, schema)),
+            Stage('combined', point_in_time_stage, inputs=('game_data', 'opponents', 'rolling_features'),
+                  code=(prepare_data, schema)),
+        ]
+    else:
+        stages += [
+            Stage('team_stats_raw', team_stats_raw_stage, params={'season': season, 'offset': TEAM_STATS_OFFSET},
+                  code=(fetch_team_stats_unscaled, team_stats_season)),
+            Stage('team_stats', team_stats_stage, inputs=('team_stats_raw',),
+                  params={'season': season, 'offset': TEAM_STATS_OFFSET},
+                  code=(scale_team_stats, team_stats_season, schema)),
+            Stage('combined', combined_stage, inputs=('game_data', 'team_stats', 'opponents'),
+                  code=(prepare_data, schema)),
+        ]
+    return Pipeline(stages, **kwargs)
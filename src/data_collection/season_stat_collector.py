@@ -1,79 +1,243 @@
+import functools
+import json
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 
-from nba_api.stats.static import teams
-from nba_api.stats.endpoints import teamdashboardbygeneralsplits
-from sklearn.preprocessing import StandardScaler
+from src.cache_manager import CacheManager
+from src.data_collection.http_transport import get_endpoint_kwargs
+from src.data_collection.previous_game_collector import DEFAULT_REQUESTS_PER_SECOND
+from src.data_collection.rate_limiter import make_rate_limiter
+from src.data_collection.response_store import ReplayMissError, fetch_endpoint
+from src.data_collection.result_sets import result_set_frame
+from src.data_collection.schema import TEAM_STATS_SCHEMA, apply_schema
+from src.data_collection.seasons import is_current_season, previous_season
+from src.file_io import write_json
+from src.instrumentation import count, span
 
 max_retries = 5
-timeout_seconds = 30
+retry_sleep_seconds = 1
 
 CACHE_DIR = "cache"
+TEAM_STAT_COLUMNS = ['FG_PCT', 'FG3_PCT', 'FT_PCT', 'REB', 'AST', 'TOV', 'STL', 'BLK', 'PTS']
+# A season in progress gains games every night; stored responses for it are refetched after a day
+CURRENT_SEASON_TTL = 86400
+# ...while a finished season's stats never change
+FINISHED_SEASON_TTL = 10 * 365 * 86400
+# Games are joined with the team stats of the season this many seasons before theirs.
+# Training uses it directly; the model bundle records it for prediction.
+TEAM_STATS_OFFSET = 0
 
 def fetch_nba_team_stats(season):
     return fetch_team_stats_cached(season)
 
+def team_stats_season(season, offset=TEAM_STATS_OFFSET):
+    """Season whose team stats are joined with season's games"""
+    return previous_season(season, offset)
+
+def team_stats_for_season(season, offset=TEAM_STATS_OFFSET, scalers=None):
+    """
+    Scaled team stats joined with season's games. Stats are scaled with the
+    scaler saved in scalers for their season when there is one (the
+    parameters the model was trained with), else fit on the season's teams.
+    Both come from the caches when they are warm.
+    """
+    stats_season = team_stats_season(season, offset)
+    scaler = (scalers or {}).get(stats_season)
+    team_stats_df = fetch_nba_team_stats(stats_season)
+    if scaler is None or load_team_stats_scaler(stats_season) == scaler:
+        return team_stats_df
+    return apply_schema(scale_team_stats(fetch_team_stats_raw_cached(stats_season), scaler=scaler),
+                        TEAM_STATS_SCHEMA)
+
+def team_stats_for_games(seasons, offset=TEAM_STATS_OFFSET, scalers=None):
+    """team_stats_for_season for each game season, keyed by (SEASON, TEAM_ID)"""
+    return pd.concat(
+        [team_stats_for_season(season, offset, scalers).assign(SEASON=season) for season in seasons],
+        ignore_index=True,
+    )
+
+def team_stats_scaler_file(season):
+    return os.path.join(CACHE_DIR, f"team_stats_{season}_scaler.json")
+
+def load_team_stats_scaler(season):
+    """StandardScaler parameters the season's cached team stats were scaled with, or None"""
+    try:
+        with open(team_stats_scaler_file(season)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def response_ttl(season):
+    """Response store TTL for a season's stats: None (kept) once the season is over"""
+    return CURRENT_SEASON_TTL if is_current_season(season) else None
+
 def fetch_team_stats_cached(season):
     cache_file = os.path.join(CACHE_DIR, f"team_stats_{season}.csv")
-    if os.path.exists(cache_file):
-        print(f"Loading cached team stats for {season} from {cache_file}")
-        return pd.read_csv(cache_file)
-
-    print(f"No cache found for {season}, fetching from API...")
-    df = fetch_nba_team_stats_api(season)
+    ttl = response_ttl(season)
+    if os.path.exists(cache_file) and (ttl is None or time.time() - os.path.getmtime(cache_file) < ttl):
+        count('cache_hits', cache='team_stats_csv', tier='disk')
+        return apply_schema(pd.read_csv(cache_file), TEAM_STATS_SCHEMA)
+
+    count('cache_misses', cache='team_stats_csv')
+    df = scale_team_stats(fetch_team_stats_raw_cached(season))
+    os.makedirs(CACHE_DIR, exist_ok=True)
     df.to_csv(cache_file, index=False)
+    save_team_stats_scaler(season, df.attrs['scaler'])
+    return apply_schema(df, TEAM_STATS_SCHEMA)
+
+def save_team_stats_scaler(season, scaler):
+    write_json(team_stats_scaler_file(season), scaler)
+
+@functools.lru_cache(maxsize=None)
+def raw_team_stats_cache():
+    return CacheManager(os.path.join(CACHE_DIR, 'team_stats_raw'))
+
+def fetch_team_stats_raw_cached(season):
+    """
+    Unscaled season stats for every team, so a saved scaler can be applied to
+    them without the API. Fetched only when the cache has no fresh copy.
+    """
+    cache = raw_team_stats_cache()
+    key = f"team_stats_raw_{season}"
+    df = cache.get(key)
+    if df is None:
+        print(f"No fresh cache for {season}, fetching from API...")
+        df = fetch_team_stats_unscaled(season)
+        cache.set(key, df, ttl=response_ttl(season) or FINISHED_SEASON_TTL)
     return df
 
-def fetch_nba_team_stats_api(season):
+def fetch_nba_team_stats_api(season, bulk=True, max_workers=8,
+                             requests_per_second=DEFAULT_REQUESTS_PER_SECOND):
+    """
+    Scaled season stats for every team; the scaler's parameters are kept in
+    df.attrs['scaler'] ({'columns', 'mean', 'scale'}).
+    """
+    return scale_team_stats(fetch_team_stats_unscaled(season, bulk, max_workers, requests_per_second))
+
+@span('fetch_team_stats')
+def fetch_team_stats_unscaled(season, bulk=True, max_workers=8,
+                              requests_per_second=DEFAULT_REQUESTS_PER_SECOND):
+    """
+    Raw season stats for every team, missing values as 0.
+    With bulk=True all teams come from one LeagueDashTeamStats request; teams
+    missing from it (or every team, if that request fails) are fetched one
+    TeamDashboardByGeneralSplits call per team, concurrently.
+    """
+    # Only needed on a cache miss, so cached reads never import nba_api
+    from nba_api.stats.static import teams
+
     nba_teams = teams.get_teams()
+    columns_to_keep = TEAM_STAT_COLUMNS
+
+    overall = fetch_league_team_stats(season, columns_to_keep) if bulk \
+        else pd.DataFrame(columns=['TEAM_ID'] + columns_to_keep)
+    missing_team_ids = [team['id'] for team in nba_teams if team['id'] not in set(overall['TEAM_ID'])]
+    if missing_team_ids:
+        print(f"Fetching {len(missing_team_ids)} teams individually for {season}")
+        individual = fetch_team_overall_stats_concurrent(
+            missing_team_ids, season, columns_to_keep, max_workers, requests_per_second
+        )
+        frames = [frame for frame in (overall, individual) if not frame.empty]
+        overall = pd.concat(frames, ignore_index=True) if frames else overall
+
+    # One row per overall line, in nba_api's team order, named as in its static list
+    team_names = pd.DataFrame({
+        'TEAM_ID': [team['id'] for team in nba_teams],
+        'TEAM_NAME': [team['full_name'] for team in nba_teams],
+    })
+    team_stats_df = team_names.merge(overall, on='TEAM_ID', how='inner')
+    return team_stats_df.fillna(0)
+
+def scale_team_stats(team_stats_df, columns=TEAM_STAT_COLUMNS, scaler=None):
+    """
+    Team stats with columns z-scored across teams; the scaler's parameters go in df.attrs['scaler'].
+    A saved scaler ({'columns', 'mean', 'scale'}) is applied as it is instead of being fit.
+    """
+    # The input may be a cached frame shared with other readers
+    team_stats_df = team_stats_df.copy()
+    if scaler is not None:
+        columns = scaler['columns']
+        team_stats_df[columns] = (team_stats_df[columns] - scaler['mean']) / scaler['scale']
+        team_stats_df.attrs['scaler'] = scaler
+        return team_stats_df
+
+    from sklearn.preprocessing import StandardScaler
 
-    team_stats_list = []
-    columns_to_keep = ['FG_PCT', 'FG3_PCT', 'FT_PCT', 'REB', 'AST', 'TOV', 'STL', 'BLK', 'PTS']
+    scaler = StandardScaler()
+    team_stats_df[columns] = scaler.fit_transform(team_stats_df[columns])
+    team_stats_df.attrs['scaler'] = {
+        'columns': list(columns),
+        'mean': scaler.mean_.tolist(),
+        'scale': scaler.scale_.tolist(),
+    }
 
-    for team in nba_teams:
-        team_id = team['id']
-        team_name = team['full_name']
+    return team_stats_df
 
+def fetch_league_team_stats(season, columns):
+    """
+    Every team's overall season line from a single league-level request
+    Returns: DataFrame of TEAM_ID plus columns, empty if the request failed
+    """
+    from nba_api.stats.endpoints import leaguedashteamstats
+
+    try:
+        payload = fetch_endpoint(
+            leaguedashteamstats.LeagueDashTeamStats,
+            ttl=response_ttl(season),
+            season=season,
+            **get_endpoint_kwargs()
+        )
+    except ReplayMissError:
+        raise
+    except Exception as e:
+        print(f"League-wide team stats request failed for {season}: {e}")
+        return pd.DataFrame(columns=['TEAM_ID'] + columns)
+
+    return result_set_frame(payload, 'LeagueDashTeamStats', ['TEAM_ID'] + columns)
+
+def fetch_team_overall_stats_concurrent(team_ids, season, columns, max_workers=8,
+                                        requests_per_second=DEFAULT_REQUESTS_PER_SECOND):
+    """Per-team OverallTeamDashboard rows (TEAM_ID plus columns), fetched on a rate-limited worker pool"""
+    rate_limiter = make_rate_limiter(requests_per_second)
+
+    def fetch(team_id):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
         team_stats = fetch_team_stats(team_id, season)
+        if team_stats is None:
+            return None
+        return result_set_frame(team_stats, 'OverallTeamDashboard', columns).assign(TEAM_ID=team_id)
 
-        team_stats_dict = team_stats.get_normalized_dict()
-
-        overall_stats = team_stats_dict['OverallTeamDashboard']
-
-        for overall_stat in overall_stats:
-            extracted_stat = {
-                'TEAM_ID': team_id,
-                'TEAM_NAME': team_name,
-            }
-
-            for column in columns_to_keep:
-                extracted_stat[column] = overall_stat[column]
-
-            team_stats_list.append(extracted_stat)
-
-    team_stats_df = pd.DataFrame(team_stats_list)
-    team_stats_df = team_stats_df.fillna(0)
-
-    scaler = StandardScaler()
-    team_stats_df[columns_to_keep] = scaler.fit_transform(team_stats_df[columns_to_keep])
-
-    return team_stats_df
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        frames = [frame for frame in executor.map(fetch, team_ids) if frame is not None]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['TEAM_ID'] + columns)
 
 def fetch_team_stats(team_id, season):
+    """Raw TeamDashboardByGeneralSplits payload, read from the response store when recorded"""
+    from nba_api.stats.endpoints import teamdashboardbygeneralsplits
+
     retries = 0
     while retries < max_retries:
         try:
-            team_stats = teamdashboardbygeneralsplits.TeamDashboardByGeneralSplits(
+            return fetch_endpoint(
+                teamdashboardbygeneralsplits.TeamDashboardByGeneralSplits,
+                ttl=response_ttl(season),
                 team_id=team_id,
                 season=season,
-                timeout=timeout_seconds
+                **get_endpoint_kwargs()
             )
-            return team_stats
+        except ReplayMissError:
+            raise
         except Exception as e:
             print("Error fetching data:", e)
             retries += 1
-            print("Retrying in 5 seconds...")
-            time.sleep(1)
+            print(f"Retrying in {retry_sleep_seconds} seconds...")
+            count('fetch_retries', endpoint=teamdashboardbygeneralsplits.TeamDashboardByGeneralSplits.endpoint)
+            count('backoff_seconds', retry_sleep_seconds,
+                  endpoint=teamdashboardbygeneralsplits.TeamDashboardByGeneralSplits.endpoint)
+            time.sleep(retry_sleep_seconds)
     print("Max retries reached. Could not fetch data.")
     return None
\ No newline at end of file
@@ -0,0 +1,35 @@
+import pandas as pd
+
+# Regular season plus playoffs; off-days are cheap once the game store has seen them
+SEASON_START = (10, 1)
+SEASON_END = (6, 30)
+
+
+def season_for_date(date):
+    """NBA season label ('2023-24') a date belongs to; seasons roll over in August"""
+    date = pd.Timestamp(date)
+    start_year = date.year if date.month >= 8 else date.year - 1
+    return f"{start_year}-{str(start_year + 1)[-2:]}"
+
+
+def season_start_year(season):
+    return int(season.split('-')[0])
+
+
+def is_current_season(season):
+    """Whether season is still being played (or has not started), so its stats can still change"""
+    return season_start_year(season) >= season_start_year(season_for_date(pd.Timestamp.today()))
+
+
+def previous_season(season, offset=1):
+    """The season offset seasons before season (season itself for 0)"""
+    start_year = season_start_year(season) - offset
+    return f"{start_year}-{str(start_year + 1)[-2:]}"
+
+
+def season_date_range(season):
+    """(start, end) Timestamps covering the season's game days"""
+    start_year = season_start_year(season)
+    start = pd.Timestamp(year=start_year, month=SEASON_START[0], day=SEASON_START[1])
+    end = pd.Timestamp(year=start_year + 1, month=SEASON_END[0], day=SEASON_END[1])
+    return start, end
@@ -0,0 +1,127 @@
+import glob
+import os
+
+import pandas as pd
+
+from src.data_collection.future_game_collector import create_game_data_df
+from src.data_collection.game_store import HistoricalGameStore
+from src.data_collection.prepare_data import TeamStatsMatrix, prepare_full_df, prepare_point_in_time_df
+from src.data_collection.previous_game_collector import DEFAULT_REQUESTS_PER_SECOND, identify_opponents
+from src.data_collection.rolling_team_stats import DEFAULT_WINDOW, RollingTeamStats
+from src.data_collection.schema import COMBINED_SCHEMA, apply_schema, write_dataset
+from src.data_collection.season_stat_collector import fetch_nba_team_stats, team_stats_season
+from src.data_collection.seasons import season_date_range
+from src.file_io import atomic_directory
+from src.instrumentation import count, span
+
+DATASET_DIR = "combined_data"
+# Two weeks of games is ~200 team rows; a chunk never spans two seasons
+DEFAULT_CHUNK_DAYS = 14
+
+
+def iter_scoreboard_chunks(start_date, end_date, chunk_days=DEFAULT_CHUNK_DAYS, game_store=None,
+                           max_workers=1, requests_per_second=DEFAULT_REQUESTS_PER_SECOND):
+    """
+    Scoreboard rows chunk_days dates at a time, in date order. Each chunk is
+    fetched into the game store (only missing dates go to the API) and read back
+    on its own, so at most one chunk is held in memory.
+    """
+    game_store = game_store or HistoricalGameStore()
+    dates = pd.date_range(start_date, end_date)
+    for first in range(0, len(dates), chunk_days):
+        chunk_start, chunk_end = dates[first], dates[min(first + chunk_days, len(dates)) - 1]
+        game_store.update(chunk_start, chunk_end, max_workers=max_workers,
+                          requests_per_second=requests_per_second)
+        scoreboard_df = game_store.load(chunk_start, chunk_end)
+        if not scoreboard_df.empty:
+            yield scoreboard_df
+
+
+def stream_season(season, feature_mode='season', chunk_days=DEFAULT_CHUNK_DAYS, game_store=None,
+                  max_workers=1, window=DEFAULT_WINDOW):
+    """
+    Combined feature rows for a season, one chunk of game dates at a time.
+    Both teams of a game share its date, so W/L and opponents are complete
+    within a chunk. Season mode joins the team stats of team_stats_season; rolling mode
+    feeds each chunk through a fresh RollingTeamStats engine in date order.
+    """
+    start_date, end_date = season_date_range(season)
+    if feature_mode == 'rolling':
+        engine, team_stats = RollingTeamStats(window=window), None
+    else:
+        engine, team_stats = None, TeamStatsMatrix(fetch_nba_team_stats(team_stats_season(season)))
+
+    for scoreboard_df in iter_scoreboard_chunks(start_date, end_date, chunk_days, game_store, max_workers):
+        game_data_df = create_game_data_df(scoreboard_df)
+        if game_data_df.empty:
+            continue
+        opponents_df = identify_opponents(game_data_df)
+
+        if engine is not None:
+            combined_data = prepare_point_in_time_df(game_data_df, opponents_df, engine.update(game_data_df))
+        else:
+            combined_data = prepare_full_df(game_data_df, team_stats, opponents_df)
+        count('streamed_rows', len(combined_data), season=season)
+        yield combined_data
+
+
+def season_partition(root, season):
+    return os.path.join(root, f"season={season}")
+
+
+@span('write_season_partition')
+def write_season_partition(chunks, root, season):
+    """
+    Writes a season's chunks as {root}/season={season}/part-00000.parquet, ...
+    The parts go to a temporary directory that replaces the partition only once
+    every chunk is written, so readers never see a half-built season.
+    Returns: rows written
+    """
+    rows = 0
+    with atomic_directory(season_partition(root, season)) as tmp_dir:
+        for part, combined_data in enumerate(chunks):
+            write_dataset(combined_data, os.path.join(tmp_dir, f"part-{part:05d}.parquet"))
+            rows += len(combined_data)
+    return rows
+
+
+def stream_to_dataset(seasons, root=DATASET_DIR, feature_mode='season', chunk_days=DEFAULT_CHUNK_DAYS,
+                      max_workers=1):
+    """
+    Builds every season straight into the partitioned dataset at root, keeping
+    only one chunk of rows in memory regardless of how many seasons there are.
+    Returns: {season: rows written}
+    """
+    game_store = HistoricalGameStore()
+    written = {}
+    for season in seasons:
+        chunks = stream_season(season, feature_mode, chunk_days, game_store, max_workers)
+        written[season] = write_season_partition(chunks, root, season)
+        print(f"Streamed {written[season]} rows for {season} into {season_partition(root, season)}")
+    return written
+
+
+def dataset_files(root=DATASET_DIR, seasons=None):
+    """Part file paths of the dataset (or the given seasons), in season and part order"""
+    if seasons is not None:
+        partitions = [season_partition(root, season) for season in seasons]
+    else:
+        partitions = [path for path in sorted(glob.glob(os.path.join(root, "season=*")))
+                      if not path.endswith('.tmp')]
+    return [path for partition in partitions
+            for path in sorted(glob.glob(os.path.join(partition, "part-*.parquet")))]
+
+
+def iter_dataset(root=DATASET_DIR, seasons=None, columns=None):
+    """Part files of the dataset as DataFrames, in season and part order"""
+    for path in dataset_files(root, seasons):
+        yield pd.read_parquet(path, columns=columns)
+
+
+def read_dataset_partitions(root=DATASET_DIR, seasons=None, columns=None):
+    """The whole dataset (or the given seasons) as one frame"""
+    frames = list(iter_dataset(root, seasons, columns))
+    if not frames:
+        return pd.DataFrame()
+    # Parts can carry different category sets, which concat widens to object
+    return apply_schema(pd.concat(frames, ignore_index=True), COMBINED_SCHEMA)
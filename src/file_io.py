@@ -0,0 +1,73 @@
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+def atomic_write(path, writer):
+    """
+    Calls writer(tmp_path) on a temp file next to path, then renames it over
+    path, so readers see either the old file or the complete new one.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    try:
+        writer(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_json(path, payload, **kwargs):
+    """Atomically writes payload as JSON; kwargs go to json.dump"""
+    def writer(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(payload, f, **kwargs)
+
+    atomic_write(path, writer)
+
+
+@contextlib.contextmanager
+def atomic_directory(path):
+    """
+    Yields a temporary directory that replaces path once the block completes,
+    so readers never see a half-written directory. It is removed on failure.
+    """
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    try:
+        yield tmp_path
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """
+    Exclusive advisory lock on path (created if missing) across processes.
+    A no-op where fcntl is unavailable.
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,120 @@
+import numpy as np
+
+DEFAULT_CHUNK_SIZE = 4096
+
+
+class FlatForest:
+    """
+    A fitted random forest flattened into contiguous NumPy arrays.
+
+    All trees' nodes live in one set of arrays with global indices; roots[t] is
+    tree t's root. Node i sends a sample to children[2 * i] (left) or
+    children[2 * i + 1] (right): right when x[feature[i]] > threshold[i], or when
+    it is NaN and missing_right[i]. Leaves point to themselves with an infinite
+    threshold, so every sample can take exactly `depth` steps with no per-step
+    masking. value[i] holds the class probabilities at node i.
+    Evaluating needs NumPy only, not sklearn.
+    """
+
+    def __init__(self, feature, threshold, children, missing_right, value, roots, depth, classes,
+                 feature_names=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.missing_right = missing_right
+        self.value = value
+        self.roots = roots
+        self.depth = int(depth)
+        self.classes_ = classes
+        self.feature_names_in_ = feature_names
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _as_array(self, X):
+        if self.feature_names_in_ is not None and hasattr(X, 'columns'):
+            X = X[list(self.feature_names_in_)]
+        # sklearn's trees compare float32 inputs against float64 thresholds
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def apply(self, X, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Leaf index reached in every tree: shape (n_trees, n_samples)"""
+        X = self._as_array(X)
+        n_samples, n_features = X.shape
+        leaves = np.empty((self.n_trees, n_samples), dtype=np.intp)
+        flat_X = X.ravel()
+
+        # Chunks keep the (trees x samples) working set small
+        for start in range(0, n_samples, chunk_size):
+            stop = min(n_samples, start + chunk_size)
+            nodes = np.repeat(self.roots, stop - start)
+            row_offsets = np.tile(np.arange(start, stop) * n_features, self.n_trees)
+            for _ in range(self.depth):
+                x = flat_X[row_offsets + self.feature[nodes]]
+                go_right = (x > self.threshold[nodes]) | (np.isnan(x) & self.missing_right[nodes])
+                nodes = self.children[2 * nodes + go_right]
+            leaves[:, start:stop] = nodes.reshape(self.n_trees, -1)
+        return leaves
+
+    def predict_proba(self, X):
+        """Mean leaf class probabilities over the trees, as RandomForestClassifier.predict_proba"""
+        return self.value[self.apply(X)].mean(axis=0)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def is_flattenable(model):
+    """Whether model is a fitted ensemble of single-output sklearn decision trees"""
+    trees = getattr(model, 'estimators_', None)
+    if trees is None or not hasattr(model, 'classes_') or np.ndim(model.classes_) != 1:
+        return False
+    return all(hasattr(tree, 'tree_') for tree in np.ravel(trees))
+
+
+def export_forest(model):
+    """Flattens a fitted RandomForestClassifier (or ExtraTreesClassifier) into a FlatForest"""
+    if not is_flattenable(model):
+        raise TypeError(f"Cannot flatten {type(model).__name__}: expected a fitted single-output tree ensemble")
+
+    feature, threshold, children, missing_right, value, roots = [], [], [], [], [], []
+    offset, depth = 0, 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        is_leaf = tree.children_left == -1
+        own_index = np.arange(offset, offset + n_nodes)
+
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+        left = np.where(is_leaf, own_index, tree.children_left + offset)
+        right = np.where(is_leaf, own_index, tree.children_right + offset)
+        children.append(np.column_stack([left, right]).ravel())
+        # Trees fit before sklearn 1.3 have no missing-value routing: NaN went right
+        missing_left = getattr(tree, 'missing_go_to_left', None)
+        if missing_left is None:
+            missing_right.append(~is_leaf)
+        else:
+            missing_right.append(~np.asarray(missing_left, dtype=bool) & ~is_leaf)
+
+        # Counts in older sklearn, fractions in newer: normalise either way
+        counts = tree.value[:, 0, :].astype(np.float64)
+        totals = counts.sum(axis=1, keepdims=True)
+        value.append(np.divide(counts, totals, out=np.zeros_like(counts), where=totals > 0))
+
+        roots.append(offset)
+        offset += n_nodes
+        depth = max(depth, tree.max_depth)
+
+    return FlatForest(
+        feature=np.concatenate(feature).astype(np.intp),
+        threshold=np.concatenate(threshold).astype(np.float64),
+        children=np.concatenate(children).astype(np.intp),
+        missing_right=np.concatenate(missing_right),
+        value=np.concatenate(value),
+        roots=np.asarray(roots, dtype=np.intp),
+        depth=depth,
+        classes=np.asarray(model.classes_),
+        feature_names=getattr(model, 'feature_names_in_', None),
+    )
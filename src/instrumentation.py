@@ -0,0 +1,250 @@
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRIC_PREFIX = 'nba_'
+TRACE_MEMORY_ENV = 'NBA_TRACE_MEMORY'
+
+
+class Registry:
+    """
+    Per-process record of stage spans and counters for one run.
+
+    A span accumulates call count, total and slowest wall time, and peak memory:
+    the process RSS high-water mark at exit, plus (with trace_memory) the most
+    traced memory allocated while it was open. Counters are keyed by name and
+    labels. Spans nest; memory tracing is process-wide, so spans running in
+    parallel threads see each other's allocations. The traced peak can only be
+    reset globally, so only spans on the main thread record it: a worker
+    thread resetting it would hide allocations from the main thread's open spans.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.started_at = time.time()
+        self.trace_memory = trace_memory
+        self.spans = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def enter(self, name):
+        frame = {'name': name, 'start': time.perf_counter(), 'child_peak': 0}
+        if tracemalloc.is_tracing() and threading.current_thread() is threading.main_thread():
+            current, peak = tracemalloc.get_traced_memory()
+            # The enclosing span keeps the peak seen so far before it is reset for this one
+            stack = self._stack()
+            if stack:
+                stack[-1]['child_peak'] = max(stack[-1]['child_peak'], peak)
+            frame['traced_at_entry'] = current
+            tracemalloc.reset_peak()
+        self._stack().append(frame)
+
+    def exit(self, name):
+        frame = self._stack().pop()
+        elapsed = time.perf_counter() - frame['start']
+
+        traced_peak = None
+        if 'traced_at_entry' in frame and tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], frame['child_peak'])
+            traced_peak = max(0, peak - frame['traced_at_entry'])
+            stack = self._stack()
+            if stack:
+                stack[-1]['child_peak'] = max(stack[-1]['child_peak'], peak)
+
+        with self._lock:
+            span = self.spans.setdefault(name, {
+                'calls': 0, 'total_s': 0.0, 'max_s': 0.0, 'rss_peak_mb': None, 'traced_peak_mb': None,
+            })
+            span['calls'] += 1
+            span['total_s'] += elapsed
+            span['max_s'] = max(span['max_s'], elapsed)
+            span['rss_peak_mb'] = _max(span['rss_peak_mb'], rss_peak_mb())
+            if traced_peak is not None:
+                span['traced_peak_mb'] = _max(span['traced_peak_mb'], traced_peak / 2**20)
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def report(self):
+        with self._lock:
+            return {
+                'started_at': self.started_at,
+                'duration_s': time.time() - self.started_at,
+                'pid': os.getpid(),
+                'argv': sys.argv,
+                'trace_memory': self.trace_memory,
+                'rss_peak_mb': rss_peak_mb(),
+                'spans': {name: dict(span) for name, span in self.spans.items()},
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+            }
+
+    def merge(self, report):
+        """Folds in a report from another process (e.g. a season build worker)"""
+        with self._lock:
+            for name, other in report['spans'].items():
+                span = self.spans.setdefault(name, {
+                    'calls': 0, 'total_s': 0.0, 'max_s': 0.0, 'rss_peak_mb': None, 'traced_peak_mb': None,
+                })
+                span['calls'] += other['calls']
+                span['total_s'] += other['total_s']
+                span['max_s'] = max(span['max_s'], other['max_s'])
+                span['rss_peak_mb'] = _max(span['rss_peak_mb'], other['rss_peak_mb'])
+                span['traced_peak_mb'] = _max(span['traced_peak_mb'], other['traced_peak_mb'])
+            for counter in report['counters']:
+                key = (counter['name'], tuple(sorted(counter['labels'].items())))
+                self.counters[key] = self.counters.get(key, 0) + counter['value']
+
+
+class span(contextlib.ContextDecorator):
+    """
+    Times a stage, as a context manager or a decorator:
+
+        with span('fetch'):
+            ...
+
+        @span('derive_wl')
+        def derive_wl(...):
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        get_registry().enter(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        get_registry().exit(self.name)
+        return False
+
+
+def _max(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b)
+
+
+def rss_peak_mb():
+    """Process resident set high-water mark so far, or None where unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = Registry(trace_memory=os.environ.get(TRACE_MEMORY_ENV) == '1')
+        return _registry
+
+
+def reset(trace_memory=None):
+    """Starts a fresh run; trace_memory defaults to the NBA_TRACE_MEMORY env var"""
+    global _registry
+    if trace_memory is None:
+        trace_memory = os.environ.get(TRACE_MEMORY_ENV) == '1'
+    with _registry_lock:
+        _registry = Registry(trace_memory=trace_memory)
+        return _registry
+
+
+def count(name, value=1, **labels):
+    get_registry().count(name, value, **labels)
+
+
+def report():
+    return get_registry().report()
+
+
+def merge(other_report):
+    get_registry().merge(other_report)
+
+
+def write_report(path):
+    """Writes the run report as JSON"""
+    with open(path, 'w') as f:
+        json.dump(report(), f, indent=2)
+
+
+def summary(run_report=None):
+    """Stages slowest first, then counters, as a printable table"""
+    run_report = run_report or report()
+    lines = [f"{'stage':<28} {'calls':>6} {'total s':>9} {'max s':>8} {'rss MB':>8} {'traced MB':>10}"]
+    for name, s in sorted(run_report['spans'].items(), key=lambda item: -item[1]['total_s']):
+        rss = '-' if s['rss_peak_mb'] is None else f"{s['rss_peak_mb']:.0f}"
+        traced = '-' if s['traced_peak_mb'] is None else f"{s['traced_peak_mb']:.1f}"
+        lines.append(f"{name:<28} {s['calls']:>6} {s['total_s']:>9.3f} {s['max_s']:>8.3f} {rss:>8} {traced:>10}")
+    for counter in run_report['counters']:
+        labels = ','.join(f"{k}={v}" for k, v in counter['labels'].items())
+        lines.append(f"{counter['name']}{{{labels}}} {counter['value']:g}")
+    return '\n'.join(lines)
+
+
+def prometheus_text(run_report=None):
+    """The run report in Prometheus text exposition format"""
+    run_report = run_report or report()
+    lines = []
+
+    def metric(name, kind, samples):
+        if not samples:
+            return
+        lines.append(f"# TYPE {METRIC_PREFIX}{name} {kind}")
+        for labels, value in samples:
+            label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            lines.append(f"{METRIC_PREFIX}{name}{{{label_text}}} {value}" if label_text
+                         else f"{METRIC_PREFIX}{name} {value}")
+
+    spans = sorted(run_report['spans'].items())
+    metric('stage_calls_total', 'counter', [({'stage': name}, s['calls']) for name, s in spans])
+    metric('stage_seconds_total', 'counter', [({'stage': name}, round(s['total_s'], 6)) for name, s in spans])
+    metric('stage_max_seconds', 'gauge', [({'stage': name}, round(s['max_s'], 6)) for name, s in spans])
+    metric('stage_traced_peak_bytes', 'gauge', [({'stage': name}, int(s['traced_peak_mb'] * 2**20))
+                                                for name, s in spans if s['traced_peak_mb'] is not None])
+    if run_report.get('rss_peak_mb') is not None:
+        metric('rss_peak_bytes', 'gauge', [({}, int(run_report['rss_peak_mb'] * 2**20))])
+
+    by_name = {}
+    for counter in run_report['counters']:
+        by_name.setdefault(counter['name'], []).append((counter['labels'], counter['value']))
+    for name, samples in sorted(by_name.items()):
+        metric(name if name.endswith('_total') else f"{name}_total", 'counter', samples)
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path):
+    with open(path, 'w') as f:
+        f.write(prometheus_text())
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
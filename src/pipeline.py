@@ -0,0 +1,160 @@
+import hashlib
+import inspect
+import json
+import os
+
+import pandas as pd
+
+from src.cache_manager import CacheManager
+from src.file_io import write_json
+from src.instrumentation import count
+
+PIPELINE_DIR = os.path.join("cache", "stages")
+# Source stages read the outside world (game store, stats API), so their output goes stale
+SOURCE_TTL = 86400
+# A derived stage's key already covers everything it depends on
+DERIVED_TTL = 30 * 86400
+# Keys from old code versions are never read again; least recently used entries go first
+DEFAULT_MAX_BYTES = 2 * 2**30
+
+
+def digest_of(*parts):
+    """Short sha256 of JSON-serializable parts"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:24]
+
+
+def frame_digest(df):
+    """Content hash of a frame: column names, dtypes and values, not the index"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(c) for c in df.columns], [str(t) for t in df.dtypes]]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:24]
+
+
+class Stage:
+    """
+    One step of a Pipeline, run as func(**inputs, **params, **options) -> DataFrame.
+
+    inputs names the upstream stages whose outputs func takes, as keyword
+    arguments of the same names. options change how func runs (say, how many
+    requests it makes at once) but not what it returns, so unlike params they
+    are not part of the stage's key. The code version hashes the source of func and
+    of every module, class or function in code, so list whatever func calls
+    whose changes should re-run it.
+    """
+
+    def __init__(self, name, func, inputs=(), params=None, code=(), ttl=None, options=None):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.params = params or {}
+        self.options = options or {}
+        self.code = tuple(code)
+        self.ttl = ttl if ttl is not None else (DERIVED_TTL if self.inputs else SOURCE_TTL)
+        self._code_version = None
+
+    def code_version(self):
+        if self._code_version is None:
+            self._code_version = digest_of(*(inspect.getsource(obj) for obj in (self.func, *self.code)))
+        return self._code_version
+
+
+class Pipeline:
+    """
+    A DAG of stages, each cached under a fingerprint of its code version, its
+    params and the content digests of its inputs.
+
+    Asking for a stage re-runs only what is stale: a stage whose code or params
+    changed, or whose source expired, runs again, and a stage downstream of it
+    runs only if that output actually changed. Outputs that are not needed to
+    run anything are never read from disk.
+    """
+
+    def __init__(self, stages, cache_dir=PIPELINE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.stages = {}
+        for stage in stages:
+            unknown = [name for name in stage.inputs if name not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage {stage.name} takes {unknown}, which must be declared before it")
+            self.stages[stage.name] = stage
+        self.cache = CacheManager(cache_dir, max_bytes=max_bytes)
+        self.ran = []
+        self._digests = {}  # stage -> output digest
+        self._keys = {}
+        self._frames = {}
+
+    def _entry(self, name):
+        return f"{name}_{self._keys[name]}"
+
+    def _digest_path(self, name):
+        return os.path.join(self.cache.cache_dir, f"{self._entry(name)}.json")
+
+    def _resolve(self, name, run):
+        """Output digest of a stage; None if run is False and it (or anything upstream) is stale"""
+        if name in self._digests:
+            return self._digests[name]
+
+        stage = self.stages[name]
+        input_digests = []
+        for input_name in stage.inputs:
+            input_digest = self._resolve(input_name, run)
+            if input_digest is None:
+                return None
+            input_digests.append(input_digest)
+        self._keys[name] = digest_of(name, stage.code_version(), stage.params, input_digests)
+
+        digest = self._stored_digest(name)
+        if digest is not None:
+            count('pipeline_stages', stage=name, result='cached')
+        elif run:
+            digest = self._run(name)
+        else:
+            return None
+        self._digests[name] = digest
+        return digest
+
+    def _stored_digest(self, name):
+        if self.cache.fresh_path(self._entry(name)) is None:
+            return None
+        try:
+            with open(self._digest_path(name)) as f:
+                return json.load(f)['digest']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _run(self, name):
+        stage = self.stages[name]
+        inputs = {input_name: self.output(input_name) for input_name in stage.inputs}
+        frame = stage.func(**inputs, **stage.params, **stage.options)
+        digest = frame_digest(frame)
+
+        self.cache.set(self._entry(name), frame, ttl=stage.ttl)
+        write_json(self._digest_path(name), {'digest': digest, 'rows': len(frame), 'params': stage.params},
+                   default=str)
+
+        self._frames[name] = frame
+        self._digests[name] = digest
+        self.ran.append(name)
+        count('pipeline_stages', stage=name, result='ran')
+        return digest
+
+    def digest(self, name):
+        """Content digest of a stage's output, running whatever is stale"""
+        return self._resolve(name, run=True)
+
+    def cached_digest(self, name):
+        """Content digest of a stage's output if nothing up to it is stale, else None"""
+        return self._resolve(name, run=False)
+
+    def output(self, name):
+        """A stage's output frame, running whatever is stale"""
+        self.digest(name)
+        if name not in self._frames:
+            frame = self.cache.get(self._entry(name))
+            if frame is None:
+                # Expired or evicted since its digest was read
+                self._run(name)
+            else:
+                self._frames[name] = frame
+        return self._frames[name]
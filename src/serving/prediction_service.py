@@ -0,0 +1,382 @@
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from src.data_collection.future_game_collector import create_game_data_df, fetch_games_for_date
+from src.data_collection.prepare_data import TeamStatsMatrix, prepare_full_df, prepare_point_in_time_df
+from src.data_collection.previous_game_collector import identify_opponents
+from src.data_collection.rolling_team_stats import engine_for_date
+from src.data_collection.schema import format_game_id
+from src.data_collection.season_stat_collector import team_stats_for_season, team_stats_season
+from src.data_collection.seasons import season_for_date
+from src.instrumentation import count, prometheus_text, span
+from src.training.model_bundle import MODEL_FILE, estimator_for, load_bundle, project_features
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_REFRESH_SECONDS = 15 * 60
+DEFAULT_MAX_BATCH_ROWS = 512
+DEFAULT_MAX_WAIT_SECONDS = 0.005
+SCOREBOARD_CACHE_DATES = 32
+
+# Request paths counted under their own label; anything else is counted as 'other'
+ROUTES = ('/health', '/metrics', '/predict', '/matchup', '/matchups')
+
+# Scoreboard columns of a game that has not been played yet
+UNPLAYED_COLUMNS = ['FG_PCT', 'FG3_PCT', 'FT_PCT', 'REB', 'AST', 'TOV', 'PTS']
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent scoring requests: frames submitted within max_wait of
+    the first one (up to max_batch_rows rows) are stacked and scored with a
+    single score(frame) call on the batcher's thread.
+    """
+
+    def __init__(self, score, max_batch_rows=DEFAULT_MAX_BATCH_ROWS, max_wait=DEFAULT_MAX_WAIT_SECONDS):
+        self.score = score
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait
+        self.batches = 0
+        self.submitted = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, frame):
+        """Scores frame as part of the next batch and returns its rows of the result"""
+        future = Future()
+        self._queue.put((frame, future))
+        return future.result()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            pending, rows = [item], len(item[0])
+            deadline = time.monotonic() + self.max_wait
+            while rows < self.max_batch_rows:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                pending.append(item)
+                rows += len(item[0])
+            self._score(pending)
+
+    def _score(self, pending):
+        self.batches += 1
+        self.submitted += len(pending)
+        try:
+            frames = [frame for frame, _ in pending]
+            result = self.score(pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0])
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+
+        offset = 0
+        for frame, future in pending:
+            future.set_result(result[offset:offset + len(frame)])
+            offset += len(frame)
+
+
+class PredictionService:
+    """
+    Keeps the model bundle, the team features (season stats matrix or rolling
+    engine) and recent scoreboards in memory, refreshing them every
+    refresh_interval seconds on a background thread. Predictions for concurrent
+    requests are batched into single predict_proba calls.
+    """
+
+    def __init__(self, model_path=MODEL_FILE, refresh_interval=DEFAULT_REFRESH_SECONDS,
+                 max_batch_rows=DEFAULT_MAX_BATCH_ROWS, max_wait=DEFAULT_MAX_WAIT_SECONDS):
+        self.model_path = model_path
+        self.refresh_interval = refresh_interval
+        self.bundle = None
+        self.feature_mode = None
+        self.team_stats = None
+        self.team_stats_season = None
+        self.engine = None
+        self.refreshed_at = None
+        self._bundle_mtime = None
+        self._scoreboards = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher = None
+        self.batcher = MicroBatcher(self._predict_proba, max_batch_rows, max_wait)
+
+    @span('service_refresh')
+    def refresh(self):
+        """Reloads the model if it changed, the team features and today's scoreboard"""
+        today = pd.Timestamp.today().normalize()
+        bundle = self.bundle
+        mtime = os.path.getmtime(self.model_path)
+        if mtime != self._bundle_mtime:
+            bundle = load_bundle(self.model_path)
+        feature_mode = bundle['feature_mode'] or 'season'
+
+        team_stats, stats_season, engine = None, None, None
+        if feature_mode == 'rolling':
+            engine = engine_for_date(today)
+        else:
+            # Same season rule and scalers as training; other seasons' stats are built on first use
+            season, offset = season_for_date(today), bundle['team_stats_offset']
+            stats_season = team_stats_season(season, offset)
+            team_stats = {season: self._season_team_stats(bundle, season)}
+        todays_games = self._load_games(today)
+
+        # Swap everything at once so a request never mixes old and new state
+        with self._lock:
+            self.bundle, self._bundle_mtime, self.feature_mode = bundle, mtime, feature_mode
+            self.team_stats, self.team_stats_season, self.engine = team_stats, stats_season, engine
+            self._scoreboards.clear()
+            self._scoreboards[today] = todays_games
+            self.refreshed_at = time.time()
+        print(f"Prediction service refreshed: {feature_mode} features, "
+              f"{0 if todays_games is None else len(todays_games[0])} team rows today")
+
+    def start(self):
+        self.refresh()
+        self._refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+        self._refresher.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.batcher.close()
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Prediction service refresh failed, keeping previous data: {e}")
+
+    def _load_games(self, game_date):
+        # Today's scoreboard bypasses the response store, so every refresh sees live scores and statuses
+        scoreboard_df = fetch_games_for_date(game_date)
+        if scoreboard_df.empty:
+            return None
+        game_data_df = create_game_data_df(scoreboard_df)
+        return game_data_df, identify_opponents(game_data_df)
+
+    def games_for_date(self, game_date):
+        """(game_data_df, opponents_df) for game_date, or None when there are no games"""
+        game_date = pd.Timestamp(game_date).normalize()
+        with self._lock:
+            if game_date in self._scoreboards:
+                self._scoreboards.move_to_end(game_date)
+                return self._scoreboards[game_date]
+
+        games = self._load_games(game_date)
+        with self._lock:
+            self._scoreboards[game_date] = games
+            while len(self._scoreboards) > SCOREBOARD_CACHE_DATES:
+                self._scoreboards.popitem(last=False)
+        return games
+
+    def _combine(self, game_data_df, opponents_df, game_date, played=True):
+        """
+        Feature rows for games on game_date. In season mode they join the team
+        stats of game_date's season. In rolling mode, games the engine
+        has already folded in take their pre-game features from its history,
+        as predict.rolling_features does; hypothetical games (played=False)
+        can only be scored after the engine's last date.
+        """
+        with self._lock:
+            feature_mode, engine = self.feature_mode, self.engine
+        if feature_mode != 'rolling':
+            return prepare_full_df(game_data_df, self._team_stats_for(game_date), opponents_df)
+
+        today = pd.Timestamp.today().normalize()
+        if played and game_date < today and season_for_date(game_date) != season_for_date(today):
+            # The refreshed engine only covers the current season
+            engine = engine_for_date(game_date + pd.Timedelta(days=1))
+        if played and engine.last_date is not None and game_date <= engine.last_date:
+            features_df = engine.training_features()
+        else:
+            features_df = engine.features_for_games(game_data_df, game_date)
+        return prepare_point_in_time_df(game_data_df, opponents_df, features_df)
+
+    @staticmethod
+    def _season_team_stats(bundle, season):
+        return TeamStatsMatrix(team_stats_for_season(season, bundle['team_stats_offset'],
+                                                     bundle['team_stats_scalers']))
+
+    def _team_stats_for(self, game_date):
+        """Season-mode stats matrix for the season game_date falls in, built and kept on first use"""
+        season = season_for_date(game_date)
+        with self._lock:
+            bundle, team_stats = self.bundle, self.team_stats
+            if season in team_stats:
+                return team_stats[season]
+        matrix = self._season_team_stats(bundle, season)
+        with self._lock:
+            # A refresh in the meantime swapped in a new bundle's stats; leave those alone
+            if self.team_stats is team_stats:
+                team_stats[season] = matrix
+        return matrix
+
+    def _predict_proba(self, combined_data):
+        """Win probability per row, projected and scored with one bundle"""
+        with self._lock:
+            bundle = self.bundle
+        estimator = estimator_for(bundle, len(combined_data))
+        with span('predict'):
+            proba = estimator.predict_proba(project_features(bundle, combined_data))
+        count('predicted_rows', len(combined_data))
+        return proba[:, list(estimator.classes_).index(1)]
+
+    def predict_games(self, game_data_df, opponents_df, game_date, played=True):
+        """One record per team row of game_data_df, in its order"""
+        combined_data = self._combine(game_data_df, opponents_df, game_date, played)
+        win_probability = self.batcher.submit(combined_data)
+
+        opponent_ids = combined_data['OPPONENT_TEAM_ID']
+        records = []
+        for i, (game_id, team_id) in enumerate(zip(format_game_id(game_data_df['GAME_ID']), game_data_df['TEAM_ID'])):
+            records.append({
+                'GAME_ID': game_id,
+                'TEAM_ID': int(team_id),
+                'OPPONENT_TEAM_ID': None if pd.isna(opponent_ids.iloc[i]) else int(opponent_ids.iloc[i]),
+                'IS_HOME': bool(game_data_df['IS_HOME'].iloc[i]) if 'IS_HOME' in game_data_df.columns else None,
+                'WIN_PROBABILITY': float(win_probability[i]),
+                'PREDICTED_OUTCOME': 'W' if win_probability[i] >= 0.5 else 'L',
+            })
+        return records
+
+    def predict_date(self, game_date=None):
+        game_date = pd.Timestamp(game_date or pd.Timestamp.today()).normalize()
+        games = self.games_for_date(game_date)
+        if games is None:
+            return []
+        return self.predict_games(*games, game_date)
+
+    def predict_matchups(self, matchups, game_date=None):
+        """matchups: (home_team_id, away_team_id) pairs, scored as unplayed games on game_date"""
+        game_date = pd.Timestamp(game_date or pd.Timestamp.today()).normalize()
+        if not matchups:
+            return []
+        home, away = np.asarray(matchups, dtype=np.int64).T
+        game_ids = np.arange(1, len(home) + 1)
+        scoreboard_df = pd.DataFrame({
+            'GAME_ID': np.repeat(game_ids, 2),
+            'TEAM_ID': np.column_stack([home, away]).ravel(),
+            'IS_HOME': np.tile([True, False], len(home)),
+            'GAME_DATE': game_date,
+            **{column: np.nan for column in UNPLAYED_COLUMNS},
+        })
+        game_data_df = create_game_data_df(scoreboard_df)
+        return self.predict_games(game_data_df, identify_opponents(game_data_df), game_date, played=False)
+
+    def health(self):
+        with self._lock:
+            return {
+                'status': 'ok' if self.bundle is not None else 'starting',
+                'feature_mode': self.feature_mode,
+                'model_version': None if self.bundle is None else self.bundle['version'],
+                'team_stats_season': self.team_stats_season,
+                'refreshed_at': self.refreshed_at,
+                'batches': self.batcher.batches,
+                'batched_requests': self.batcher.submitted,
+            }
+
+
+def make_handler(service):
+    """
+    GET  /health
+    GET  /metrics                          stage timings and counters, Prometheus text format
+    GET  /predict?date=YYYY-MM-DD          games on date (default today)
+    GET  /matchup?home=ID&away=ID[&date=]  a hypothetical game
+    POST /matchups {"date": ..., "matchups": [{"home": ID, "away": ID}, ...]}
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            if url.path == '/health':
+                self._respond(200, service.health())
+            elif url.path == '/metrics':
+                self._respond_text(200, prometheus_text(), 'text/plain; version=0.0.4')
+            elif url.path == '/predict':
+                self._handle(lambda: {'games': service.predict_date(query.get('date'))})
+            elif url.path == '/matchup':
+                self._handle(lambda: {'games': service.predict_matchups(
+                    [(int(query['home']), int(query['away']))], query.get('date')
+                )})
+            else:
+                self._respond(404, {'error': f"Unknown path {url.path}"})
+
+        def do_POST(self):
+            if urlsplit(self.path).path != '/matchups':
+                self._respond(404, {'error': f"Unknown path {self.path}"})
+                return
+
+            def predict():
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                matchups = [(int(m['home']), int(m['away'])) for m in body.get('matchups', [])]
+                return {'games': service.predict_matchups(matchups, body.get('date'))}
+
+            self._handle(predict)
+
+        def _handle(self, produce):
+            try:
+                self._respond(200, produce())
+            except (KeyError, ValueError, TypeError) as e:
+                self._respond(400, {'error': str(e)})
+            except Exception as e:
+                self._respond(500, {'error': str(e)})
+
+        def _respond(self, status, payload):
+            self._respond_text(status, json.dumps(payload), 'application/json')
+
+        def _respond_text(self, status, text, content_type):
+            path = urlsplit(self.path).path
+            count('http_requests', path=path if path in ROUTES else 'other', status=status)
+            body = text.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Starts the service and blocks serving HTTP until interrupted"""
+    service.start()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Serving predictions on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
@@ -0,0 +1,73 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from src.data_collection.response_store import ResponseStore
+
+
+class StatsStandIn:
+    """
+    Local stand-in for stats.nba.com, for running the collectors and the
+    prediction service without the real API.
+
+    payload_for(endpoint, params) returns the JSON payload to serve, or None for
+    a 404; by default payloads are read from a response store directory. Point
+    the collectors at it with configure_transport(base_url=stand_in.base_url)
+    or NBA_STATS_BASE_URL.
+    """
+
+    def __init__(self, payload_for=None, store_dir=None, host='127.0.0.1', port=0):
+        if payload_for is None:
+            store = ResponseStore(store_dir, mode='replay') if store_dir else ResponseStore(mode='replay')
+            payload_for = store.get
+        self.payload_for = payload_for
+        self.requests = []
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/stats/{{endpoint}}"
+
+    def _handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                endpoint = url.path.rstrip('/').rsplit('/', 1)[-1]
+                params = dict(parse_qsl(url.query, keep_blank_values=True))
+                stand_in.requests.append((endpoint, params))
+
+                payload = stand_in.payload_for(endpoint, params)
+                if payload is None:
+                    self.send_error(404, f"No payload for {endpoint}")
+                    return
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
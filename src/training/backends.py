@@ -0,0 +1,111 @@
+import io
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# sklearn is imported by the factories, so listing backends (e.g. for --help) stays cheap
+DEFAULT_BACKEND = 'forest'
+
+
+def make_forest(**params):
+    from sklearn.ensemble import RandomForestClassifier
+
+    defaults = {'n_estimators': 100, 'max_depth': None, 'min_samples_split': 2, 'random_state': 42}
+    return RandomForestClassifier(**{**defaults, **params})
+
+
+def make_hist_gb(**params):
+    from sklearn.ensemble import HistGradientBoostingClassifier
+
+    defaults = {'max_iter': 200, 'learning_rate': 0.05, 'random_state': 42}
+    return HistGradientBoostingClassifier(**{**defaults, **params})
+
+
+def make_logistic(**params):
+    from sklearn.impute import SimpleImputer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    defaults = {'max_iter': 1000}
+    return make_pipeline(SimpleImputer(), StandardScaler(), LogisticRegression(**{**defaults, **params}))
+
+
+# name -> (factory, handles NaN features itself)
+BACKENDS = {
+    'forest': (make_forest, False),
+    'hist_gb': (make_hist_gb, True),
+    'logistic': (make_logistic, True),
+}
+
+
+def make_model(backend=DEFAULT_BACKEND, **params):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown model backend {backend!r}, expected one of {sorted(BACKENDS)}")
+    factory, _ = BACKENDS[backend]
+    return factory(**params)
+
+
+def handles_missing(backend):
+    """Whether the backend can be fit on rows with NaN features"""
+    return BACKENDS[backend][1]
+
+
+def artifact_size(model):
+    """Bytes the model takes when dumped with joblib"""
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.getbuffer().nbytes
+
+
+def compare_backends(X, y, groups, backends=None, n_splits=5):
+    """
+    Fits every backend on the same game-grouped folds.
+    Returns: one row per backend with mean fit time, predict latency per 1000 rows,
+    joblib artifact size (model fit on fold 0) and accuracy.
+    """
+    from sklearn.metrics import accuracy_score
+
+    from src.training.tuning import game_group_folds
+
+    backends = backends or list(BACKENDS)
+    groups = np.asarray(groups)
+    folds = game_group_folds(groups, n_splits=n_splits)
+
+    rows = []
+    for backend in backends:
+        fit_s, predict_ms, accuracies, size = [], [], [], None
+        for fold, (train_idx, test_idx) in enumerate(folds):
+            X_train, y_train = X.iloc[train_idx], y.iloc[train_idx]
+            X_test, y_test = X.iloc[test_idx], y.iloc[test_idx]
+            if not handles_missing(backend):
+                X_train = X_train.dropna()
+                y_train = y_train[X_train.index]
+
+            model = make_model(backend)
+            start = time.perf_counter()
+            model.fit(X_train, y_train)
+            fit_s.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            y_pred = model.predict(X_test)
+            predict_ms.append((time.perf_counter() - start) * 1000 / len(X_test) * 1000)
+
+            accuracies.append(accuracy_score(y_test, y_pred))
+            if fold == 0:
+                size = artifact_size(model)
+
+        rows.append({
+            'backend': backend,
+            'fit_s': np.mean(fit_s),
+            'predict_ms_per_1k': np.mean(predict_ms),
+            'artifact_kb': size / 1024,
+            'accuracy': np.mean(accuracies),
+            'accuracy_std': np.std(accuracies),
+        })
+
+    report = pd.DataFrame(rows)
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    return report
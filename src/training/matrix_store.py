@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.file_io import atomic_directory
+
+MATRIX_DIR = os.path.join("cache", "matrices")
+# Bump when the stored layout changes, so old matrices are not reused. Keys
+# already cover the code building X and y (see main.training_matrix_key)
+MATRIX_VERSION = 1
+
+
+def file_digest(path, block_size=1 << 20):
+    """sha256 of a file's bytes, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(*parts):
+    """Store key for JSON-serializable parts describing a training set's inputs"""
+    payload = json.dumps([MATRIX_VERSION, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:24]
+
+
+class TrainingMatrix:
+    """
+    X (float32, rows x features), y (int8) and groups (GAME_ID, int64) of one
+    training set. Arrays opened from the store are read-only memory maps: joblib
+    hands them to worker processes as file references instead of pickling them.
+    """
+
+    def __init__(self, X, y, groups, feature_names, path=None):
+        self.X = X
+        self.y = y
+        self.groups = groups
+        self.feature_names = list(feature_names)
+        self.path = path
+
+    def __len__(self):
+        return len(self.y)
+
+    def frame(self):
+        """X as a DataFrame over the same memory (no copy)"""
+        return pd.DataFrame(self.X, columns=self.feature_names, copy=False)
+
+    def target(self):
+        return pd.Series(self.y, name='WL', copy=False)
+
+
+class MatrixStore:
+    """
+    Training matrices as .npy files under {root}/{key}/, where key fingerprints
+    the data they were built from. A matrix directory only appears once all of
+    its files are written.
+    """
+
+    def __init__(self, root=MATRIX_DIR):
+        self.root = root
+
+    def path_for(self, key):
+        return os.path.join(self.root, key)
+
+    def get(self, key, mmap_mode='r'):
+        """The stored matrix for key, memory-mapped, or None"""
+        path = self.path_for(key)
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('version') != MATRIX_VERSION:
+            return None
+
+        arrays = [np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in ('X', 'y', 'groups')]
+        return TrainingMatrix(*arrays, meta['feature_names'], path)
+
+    def put(self, key, X, y, groups):
+        """
+        Writes X (a DataFrame; every column as float32, missing values as NaN),
+        y and groups under key, column by column so no float32 copy of X is
+        held in memory. Returns: the stored matrix, memory-mapped.
+        """
+        return self.put_parts(key, [(X, y, groups)], len(X))
+
+    def put_parts(self, key, parts, rows):
+        """
+        put for a training set arriving as (X, y, groups) parts with the same
+        columns and rows rows in total. Each part is written straight into the
+        memory-mapped files, so only one part is held in memory at a time.
+        """
+        with atomic_directory(self.path_for(key)) as tmp_path:
+            X_out, y_out, groups_out, feature_names, offset = None, None, None, None, 0
+            for X, y, groups in parts:
+                if X_out is None:
+                    feature_names = [str(column) for column in X.columns]
+                    X_out = np.lib.format.open_memmap(os.path.join(tmp_path, 'X.npy'), mode='w+',
+                                                      dtype=np.float32, shape=(rows, len(feature_names)))
+                    y_out = np.lib.format.open_memmap(os.path.join(tmp_path, 'y.npy'), mode='w+',
+                                                      dtype=np.int8, shape=(rows,))
+                    groups_out = np.lib.format.open_memmap(os.path.join(tmp_path, 'groups.npy'), mode='w+',
+                                                           dtype=np.int64, shape=(rows,))
+                elif [str(column) for column in X.columns] != feature_names:
+                    raise ValueError(f"Training set part has columns {list(X.columns)}, expected {feature_names}")
+
+                end = offset + len(X)
+                for i, column in enumerate(X.columns):
+                    X_out[offset:end, i] = X[column].to_numpy(dtype=np.float32, na_value=np.nan)
+                y_out[offset:end] = np.asarray(y, dtype=np.int8)
+                groups_out[offset:end] = np.asarray(groups, dtype=np.int64)
+                offset = end
+
+            if X_out is None or offset != rows:
+                raise ValueError(f"Expected {rows} training rows, got {offset}")
+            for array in (X_out, y_out, groups_out):
+                array.flush()
+            del X_out, y_out, groups_out
+
+            meta = {
+                'version': MATRIX_VERSION,
+                'feature_names': feature_names,
+                'rows': rows,
+                'created_at': time.time(),
+            }
+            with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+                json.dump(meta, f)
+        return self.get(key)
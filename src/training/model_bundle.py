@@ -0,0 +1,127 @@
+import os
+import time
+
+import joblib
+
+from src.inference.flat_forest import export_forest, is_flattenable
+
+MODEL_FILE = 'nba_game_predictor.pkl'
+BUNDLE_VERSION = 1
+# FlatForest beats sklearn's predict_proba up to a few hundred rows and loses beyond
+# (benchmarks/bench_flat_forest.py), so larger batches go to the sklearn estimator
+FLAT_MAX_ROWS = 200
+
+
+def make_bundle(model, X, backend, feature_mode, seasons, team_stats_scalers=None, team_stats_offset=0):
+    """
+    Everything predict.py needs to rebuild the training inputs:
+    the estimator, the ordered feature columns with their dtypes, the
+    StandardScaler parameters of each season's team stats (season mode only,
+    keyed by the stats season) and how many seasons before the games' own
+    season those team stats were taken from.
+    """
+    return {
+        'version': BUNDLE_VERSION,
+        'estimator': model,
+        'features': [(column, str(dtype)) for column, dtype in X.dtypes.items()],
+        'backend': backend,
+        'feature_mode': feature_mode,
+        'seasons': list(seasons),
+        'team_stats_scalers': team_stats_scalers or {},
+        'team_stats_offset': team_stats_offset,
+        'created_at': time.time(),
+    }
+
+
+def flat_bundle_path(path=MODEL_FILE):
+    root, ext = os.path.splitext(path)
+    return f"{root}.flat{ext}"
+
+
+def save_bundle(bundle, path=MODEL_FILE):
+    """
+    Saves the bundle and, for tree ensembles, a companion bundle whose estimator
+    is the FlatForest export, which loads and predicts without sklearn.
+    """
+    # Uncompressed, so numpy arrays in the bundle can be memory-mapped on load. Only
+    # the FlatForest's arrays stay mapped: sklearn's Tree.__setstate__ copies its
+    # nodes and values to the heap whatever mmap_mode says
+    joblib.dump(bundle, path)
+
+    flat_path = flat_bundle_path(path)
+    if is_flattenable(bundle['estimator']):
+        joblib.dump({**bundle, 'estimator': export_forest(bundle['estimator'])}, flat_path)
+    elif os.path.exists(flat_path):
+        os.remove(flat_path)
+
+
+def load_bundle(path=MODEL_FILE, mmap=True, flat=True):
+    """
+    Bundle saved by save_bundle, loaded with mmap_mode='r'. That maps plain numpy
+    arrays such as the FlatForest's; sklearn trees are copied into memory on load
+    regardless. With flat=True and a FlatForest companion at least as new, only
+    the companion is read: its estimator becomes 'flat_estimator' and the sklearn
+    estimator is unpickled by estimator_for the first time a batch needs it, so
+    small-batch prediction never imports sklearn.
+    A bare estimator from before bundles existed is wrapped as version 0, with
+    its feature list taken from feature_names_in_.
+    """
+    flat_path = flat_bundle_path(path)
+    if not (flat and os.path.exists(flat_path) and os.path.getmtime(flat_path) >= os.path.getmtime(path)):
+        return _load(path, mmap)
+
+    bundle = _load(flat_path, mmap)
+    bundle['flat_estimator'] = bundle['estimator']
+    bundle['estimator'] = None
+    bundle['estimator_source'] = (path, mmap)
+    return bundle
+
+
+def _load(path, mmap):
+    loaded = joblib.load(path, mmap_mode='r' if mmap else None)
+    if not isinstance(loaded, dict):
+        names = getattr(loaded, 'feature_names_in_', None)
+        if names is None:
+            raise ValueError(f"{path} holds an estimator without feature names; retrain with main.py")
+        return {
+            'version': 0,
+            'estimator': loaded,
+            'features': [(name, 'float32') for name in names],
+            'backend': None,
+            'feature_mode': None,
+            'seasons': [],
+            'team_stats_scalers': {},
+            'team_stats_offset': 0,
+            'created_at': None,
+        }
+
+    if loaded.get('version', 0) > BUNDLE_VERSION:
+        raise ValueError(
+            f"{path} is model bundle version {loaded['version']}, this code reads up to {BUNDLE_VERSION}"
+        )
+    # Bundles saved before the offset was recorded were trained on same-season stats
+    loaded.setdefault('team_stats_offset', 0)
+    return loaded
+
+
+def estimator_for(bundle, rows):
+    """The estimator to score a batch of rows with: the FlatForest export up to FLAT_MAX_ROWS, else sklearn's"""
+    flat = bundle.get('flat_estimator')
+    if flat is not None and rows <= FLAT_MAX_ROWS:
+        return flat
+    if bundle['estimator'] is None:
+        # Deferred by load_bundle; concurrent first loads are harmless, the last one wins
+        bundle['estimator'] = _load(*bundle['estimator_source'])['estimator']
+    return bundle['estimator']
+
+
+def project_features(bundle, combined_data):
+    """
+    combined_data reduced to the bundle's feature columns, in training order and dtypes.
+    Missing features raise instead of being silently filled.
+    """
+    names = [name for name, _ in bundle['features']]
+    missing = [name for name in names if name not in combined_data.columns]
+    if missing:
+        raise ValueError(f"Prediction data is missing model features: {missing}")
+    return combined_data.reindex(columns=names).astype(dict(bundle['features']))
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import GroupKFold, HalvingRandomSearchCV
+
+FOLDS_DIR = os.path.join("cache", "folds")
+
+# n_estimators is the halving resource, so it is not searched directly
+FOREST_PARAM_SPACE = {
+    'max_depth': [None, 6, 8, 12, 16, 24],
+    'min_samples_split': [2, 5, 10, 20, 40],
+    'min_samples_leaf': [1, 2, 4, 8, 16],
+    'max_features': ['sqrt', 'log2', 0.3, 0.5],
+    'bootstrap': [True, False],
+}
+
+
+def game_group_folds(groups, n_splits=5, folds_dir=FOLDS_DIR):
+    """
+    GroupKFold splits by GAME_ID, so both rows of a game land in the same fold.
+    Fold assignments are cached on disk keyed by the groups themselves and reused.
+    Returns: list of (train_indices, test_indices)
+    """
+    groups = np.asarray(groups)
+    digest = hashlib.sha1(pd.util.hash_array(groups).tobytes()).hexdigest()[:16]
+    path = os.path.join(folds_dir, f"game_folds_{n_splits}_{digest}.npy")
+
+    if os.path.exists(path):
+        fold_of_row = np.load(path)
+    else:
+        fold_of_row = np.empty(len(groups), dtype=np.int8)
+        for fold, (_, test_idx) in enumerate(GroupKFold(n_splits=n_splits).split(groups, groups=groups)):
+            fold_of_row[test_idx] = fold
+        os.makedirs(folds_dir, exist_ok=True)
+        np.save(path, fold_of_row)
+
+    rows = np.arange(len(groups))
+    return [(rows[fold_of_row != fold], rows[fold_of_row == fold]) for fold in range(n_splits)]
+
+
+def tune_forest(X, y, groups, n_candidates=64, min_trees=25, max_trees=400, factor=3,
+                n_splits=5, n_jobs=-1, random_state=42):
+    """
+    Successive-halving random search over forest parameters, with the number of
+    trees as the halving resource: every candidate starts with min_trees and only
+    the best 1/factor of each round get factor times more trees.
+    Candidates are evaluated in parallel across cores on the same game-grouped folds.
+    Returns: (best model refit on all rows, per-trial results DataFrame)
+    """
+    # Only subset when rows are missing values, so a memory-mapped X stays mapped
+    groups = np.asarray(groups)
+    complete = X.notna().all(axis=1).to_numpy()
+    X_no_na, y_no_na = X, y
+    if not complete.all():
+        X_no_na, y_no_na, groups = X[complete], y[complete], groups[complete]
+
+    folds = game_group_folds(groups, n_splits=n_splits)
+
+    forest = RandomForestClassifier(random_state=random_state, n_jobs=1)
+    search = HalvingRandomSearchCV(
+        forest,
+        FOREST_PARAM_SPACE,
+        n_candidates=n_candidates,
+        resource='n_estimators',
+        min_resources=min_trees,
+        max_resources=max_trees,
+        factor=factor,
+        cv=folds,
+        scoring='accuracy',
+        refit=False,
+        n_jobs=n_jobs,
+        random_state=random_state,
+    )
+
+    start = time.perf_counter()
+    # Workers get the plain array: joblib reaches a memmap through the file and
+    # mis-reads the transposed view a DataFrame keeps over it
+    search.fit(X_no_na.to_numpy(), np.asarray(y_no_na))
+    elapsed = time.perf_counter() - start
+
+    # Refit here on the frame so the model keeps its feature names
+    best = clone(forest).set_params(**search.best_params_, n_jobs=n_jobs)
+    best.fit(X_no_na, y_no_na)
+
+    trials = trial_report(search)
+    print(f"Tuning finished in {elapsed:.1f}s over {len(trials)} trials")
+    print(trials.head(10).to_string(index=False))
+    print(f"Best parameters: {search.best_params_} (accuracy {search.best_score_:.4f})")
+    return best, trials
+
+
+def trial_report(search):
+    """One row per (round, candidate): trees used, CV accuracy and fit/score timings"""
+    results = search.cv_results_
+    trials = pd.DataFrame({
+        'round': results['iter'],
+        'n_estimators': results['n_resources'],
+        'mean_accuracy': results['mean_test_score'],
+        'std_accuracy': results['std_test_score'],
+        'mean_fit_s': results['mean_fit_time'],
+        'mean_score_s': results['mean_score_time'],
+        'params': [str(params) for params in results['params']],
+    })
+    return trials.sort_values(['round', 'mean_accuracy'], ascending=[False, False])
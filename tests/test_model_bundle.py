@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from src.training.model_bundle import FLAT_MAX_ROWS, make_bundle, save_bundle
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_small_batches_skip_sklearn(tmp_path):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(300, 4)).astype('float32'), columns=['A', 'B', 'C', 'D'])
+    y = (X['A'] + X['B'] > 0).astype(int)
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)
+    model_path = os.path.join(str(tmp_path), 'model.pkl')
+    save_bundle(make_bundle(model, X, 'forest', 'season', []), model_path)
+    X.to_csv(os.path.join(str(tmp_path), 'X.csv'), index=False)
+    expected = model.predict_proba(X)
+
+    # A fresh interpreter, since this one has sklearn loaded already
+    script = textwrap.dedent(f"""
+        import sys
+        import numpy as np
+        import pandas as pd
+        from src.training.model_bundle import estimator_for, load_bundle, project_features
+
+        bundle = load_bundle({model_path!r})
+        X = project_features(bundle, pd.read_csv({os.path.join(str(tmp_path), 'X.csv')!r}))
+        small = estimator_for(bundle, {FLAT_MAX_ROWS}).predict_proba(X.iloc[:{FLAT_MAX_ROWS}])
+        assert 'sklearn' not in sys.modules
+        large = estimator_for(bundle, len(X)).predict_proba(X)
+        assert 'sklearn' in sys.modules
+        np.save({os.path.join(str(tmp_path), 'small.npy')!r}, small)
+        np.save({os.path.join(str(tmp_path), 'large.npy')!r}, large)
+    """)
+    subprocess.run([sys.executable, '-c', script], cwd=REPO_ROOT, check=True)
+
+    np.testing.assert_allclose(np.load(os.path.join(str(tmp_path), 'small.npy')), expected[:FLAT_MAX_ROWS])
+    np.testing.assert_allclose(np.load(os.path.join(str(tmp_path), 'large.npy')), expected)
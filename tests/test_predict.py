@@ -0,0 +1,23 @@
+import os
+
+import pandas as pd
+
+from predict import write_predictions
+
+
+def test_write_predictions_parquet_round_trip(tmp_path):
+    predictions = pd.DataFrame({
+        'GAME_ID': ['0022400001', '0022400001', '0022400002', '0022400002'],
+        'GAME_DATE': pd.to_datetime(['2024-10-22'] * 2 + ['2024-10-23'] * 2),
+        'SEASON': ['2024-25'] * 4,
+        'TEAM_ID': pd.array([1610612737, 1610612738, 1610612739, 1610612740], dtype='int32'),
+        'OPPONENT_TEAM_ID': pd.array([1610612738, 1610612737, 1610612740, 1610612739], dtype='int32'),
+        'IS_HOME': [True, False, True, False],
+        'WL': ['W', 'L', None, None],
+        'WIN_PROBABILITY': pd.array([0.6, 0.4, 0.3, 0.7], dtype='float32'),
+        'Predicted_Outcome': ['W', 'L', 'L', 'W'],
+    })
+    path = os.path.join(str(tmp_path), 'predictions.parquet')
+    write_predictions(predictions, path, chunk_rows=2)
+
+    pd.testing.assert_frame_equal(pd.read_parquet(path), predictions)
@@ -0,0 +1,114 @@
+import os
+
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from main import prepare_features
+from src.data_collection.future_game_collector import create_game_data_df, scoreboard_frame
+from src.data_collection.http_transport import configure_transport
+from src.data_collection.prepare_data import prepare_full_df
+from src.data_collection.previous_game_collector import identify_opponents
+from src.data_collection.response_store import configure_response_store
+from src.data_collection.season_stat_collector import TEAM_STAT_COLUMNS, scale_team_stats
+from src.data_collection.seasons import season_for_date
+from src.serving.prediction_service import PredictionService
+from src.serving.stats_stand_in import StatsStandIn
+from src.training.model_bundle import make_bundle, save_bundle
+
+TEAM_IDS = [1610612737, 1610612738, 1610612739, 1610612740]
+GAMES = [('0022400001', TEAM_IDS[0], TEAM_IDS[1]), ('0022400002', TEAM_IDS[2], TEAM_IDS[3])]
+LINE_SCORE_HEADERS = ['GAME_ID', 'TEAM_ID', 'FG_PCT', 'FG3_PCT', 'FT_PCT', 'REB', 'AST', 'TOV', 'PTS']
+
+
+def scoreboard_payload(points):
+    """Both games in progress; points[i] is the running score of TEAM_IDS[i]"""
+    header = [[game_id, home, away, 2] for game_id, home, away in GAMES]
+    lines = [[game_id, team_id, 0.45, 0.35, 0.75, 20, 10, 5, points[TEAM_IDS.index(team_id)]]
+             for game_id, home, away in GAMES for team_id in (home, away)]
+    return {'resultSets': [
+        {'name': 'GameHeader', 'headers': ['GAME_ID', 'HOME_TEAM_ID', 'VISITOR_TEAM_ID', 'GAME_STATUS_ID'],
+         'rowSet': header},
+        {'name': 'LineScore', 'headers': LINE_SCORE_HEADERS, 'rowSet': lines},
+    ]}
+
+
+def team_stats_payload():
+    from nba_api.stats.static import teams
+
+    rows = [[team['id']] + [float(i + j) for j in range(len(TEAM_STAT_COLUMNS))]
+            for i, team in enumerate(teams.get_teams())]
+    return {'resultSets': [{'name': 'LeagueDashTeamStats', 'headers': ['TEAM_ID'] + TEAM_STAT_COLUMNS,
+                            'rowSet': rows}]}
+
+
+@pytest.fixture
+def stand_in(tmp_path, monkeypatch):
+    """Stats API stand-in serving today's two games (scores move on every request) and team stats"""
+    monkeypatch.chdir(tmp_path)
+    configure_response_store(os.path.join(str(tmp_path), 'responses'), mode='record')
+    today = pd.Timestamp.today().normalize().strftime('%m/%d/%Y')
+    scoreboard_requests = []
+
+    def payload_for(endpoint, params):
+        if endpoint.lower() == 'leaguedashteamstats':
+            return team_stats_payload()
+        if endpoint.lower() == 'scoreboardv2':
+            if params.get('GameDate') != today:
+                return {'resultSets': [{'name': 'GameHeader', 'headers': [], 'rowSet': []},
+                                       {'name': 'LineScore', 'headers': [], 'rowSet': []}]}
+            scoreboard_requests.append(params)
+            step = len(scoreboard_requests)
+            return scoreboard_payload([10 * step, 9 * step, 8 * step, 11 * step])
+        return None
+
+    with StatsStandIn(payload_for) as server:
+        configure_transport(base_url=server.base_url)
+        server.scoreboard_requests = scoreboard_requests
+        yield server
+    configure_transport(base_url='')
+    configure_response_store()
+
+
+def train_bundle(path):
+    """A small forest fit on the feature rows the service builds for the stand-in's games"""
+    today = pd.Timestamp.today().normalize()
+    game_data_df = create_game_data_df(scoreboard_frame(scoreboard_payload([100, 90, 80, 110]), today, ''))
+    team_stats = team_stats_payload()['resultSets'][0]
+    team_stats_df = scale_team_stats(pd.DataFrame(team_stats['rowSet'], columns=team_stats['headers']))
+    combined_data = prepare_full_df(game_data_df, team_stats_df, identify_opponents(game_data_df))
+    X, y, _ = prepare_features(combined_data)
+    X = X.select_dtypes(exclude=['category', 'object'])
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)
+    save_bundle(make_bundle(model, X, 'forest', 'season', []), path)
+
+
+def test_service_against_stand_in(stand_in, tmp_path):
+    model_path = os.path.join(str(tmp_path), 'model.pkl')
+    train_bundle(model_path)
+    service = PredictionService(model_path, refresh_interval=3600, max_wait=0.001)
+    try:
+        service.start()
+        games = service.predict_date()
+        assert [(g['GAME_ID'], g['TEAM_ID'], g['OPPONENT_TEAM_ID']) for g in games] == [
+            ('0022400001', TEAM_IDS[0], TEAM_IDS[1]), ('0022400001', TEAM_IDS[1], TEAM_IDS[0]),
+            ('0022400002', TEAM_IDS[2], TEAM_IDS[3]), ('0022400002', TEAM_IDS[3], TEAM_IDS[2]),
+        ]
+        assert all(0.0 <= g['WIN_PROBABILITY'] <= 1.0 for g in games)
+
+        matchup = service.predict_matchups([(TEAM_IDS[0], TEAM_IDS[3])])
+        assert [(g['TEAM_ID'], g['IS_HOME']) for g in matchup] == [(TEAM_IDS[0], True), (TEAM_IDS[3], False)]
+
+        # A refresh asks the API for today's scoreboard again instead of replaying a recorded one
+        service.refresh()
+        assert len(stand_in.scoreboard_requests) == 2
+        assert not os.path.exists(os.path.join(str(tmp_path), 'responses', 'scoreboardv2'))
+        assert service.health()['status'] == 'ok'
+
+        # Past seasons' games join their own season's stats, not the refreshed one's
+        today = pd.Timestamp.today().normalize()
+        last_season_date = today - pd.DateOffset(years=1)
+        service._team_stats_for(last_season_date)
+        assert set(service.team_stats) == {season_for_date(today), season_for_date(last_season_date)}
+    finally:
+        service.stop()